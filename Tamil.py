@@ -1,152 +1,39 @@
 import streamlit as st
 import pandas as pd
 import os
-import tempfile
-import sys
-from huggingface_hub import hf_hub_download
-import warnings
-import pyarrow.parquet as pq
-import google.generativeai as genai
 import json
 import re
-import time
+import uuid
+import warnings
+from streamlit.errors import StreamlitAPIException
+from analytics import AnswerLog
+from bootstrap import bootstrap
+from dedup import open_question_clusters
+from language import detect_language
+from llm_cache import NearDuplicateCache, TwoTierCache, cache_key
+from llm_client import LLMClient
+from prefetch import Prefetcher
+from prompts import chat_prompt, explanation_prompt
+from question_store import (ExplanationSidecar, answer_index, correct_option, explanation_sidecar_path,
+                            load_question_store, question_at, render_options)
+from quiz_generator import QuizGenerator
+from quiz_sampler import QuizSampler
+from rate_limit import BACKGROUND, INTERACTIVE, STUDY
+from retrieval import QuestionRetriever
+from search import QuestionSearch
+from session_records import AnswerSheet, ChatHistory, GeneratedQuestion, QuizAttempt
+from study_material import MAX_TOPICS, StudyMaterialBuilder, split_topics
+import telemetry
 
 # Disable all warnings
 warnings.filterwarnings("ignore")
 
-# ----- Gemini API Setup -----
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
 # ----- Critical Configuration to Prevent Permission Errors -----
-# Create a secure cache directory
-cache_base = tempfile.mkdtemp()
-
-# Set environment variables to prevent Streamlit from writing to root
-os.environ['HOME'] = cache_base
-os.environ['STREAMLIT_GLOBAL_METRICS'] = '0'
-os.environ['STREAMLIT_SERVER_PORT'] = '8501'
-os.environ['STREAMLIT_SERVER_HEADLESS'] = 'true'
-os.environ['GATHER_USAGE_STATS'] = 'false'
-
-# Create specific cache directories
-hf_cache = os.path.join(cache_base, "hf_cache")
-os.makedirs(hf_cache, exist_ok=True)
-
-streamlit_dir = os.path.join(cache_base, ".streamlit")
-os.makedirs(streamlit_dir, exist_ok=True)
-
-# Set environment variables
-os.environ['HF_HOME'] = hf_cache
-os.environ['HF_DATASETS_CACHE'] = hf_cache
-os.environ['TRANSFORMERS_CACHE'] = hf_cache
-os.environ['DATASETS_CACHE'] = hf_cache
-os.environ['STREAMLIT_HOME'] = streamlit_dir
-
-# Create Streamlit config file to disable metrics
-config_path = os.path.join(streamlit_dir, "config.toml")
-with open(config_path, 'w') as f:
-    f.write("[server]\n")
-    f.write("headless = true\n")
-    f.write("port = 8501\n")
-    f.write("enableCORS = false\n")
-    f.write("enableXsrfProtection = false\n")
-    f.write("\n")
-    f.write("[browser]\n")
-    f.write("gatherUsageStats = false\n")
-
-# ----- Comprehensive Monkey Patch for Streamlit Metrics -----
-try:
-    # Monkey patch Installation class
-    from streamlit.runtime.metrics_util import Installation
-    
-    class SafeInstallation(Installation):
-        def __init__(self):
-            # Bypass the parent constructor
-            self.installation_id_v3 = "disabled"
-            self.installation_id_v4 = "disabled"
-            self.installed_at = 0
-            
-        @classmethod
-        def instance(cls):
-            return SafeInstallation()
-    
-    Installation.instance = SafeInstallation.instance
-    
-    # Monkey patch the problematic file_util functions
-    from streamlit import file_util
-    
-    def safe_streamlit_write(path):
-        # Create a safe path in our temp directory
-        safe_path = os.path.join(streamlit_dir, os.path.basename(path))
-        try:
-            os.makedirs(os.path.dirname(safe_path), exist_ok=True)
-            with open(safe_path, 'w') as f:
-                yield f
-        except Exception:
-            # Use a dummy file-like object
-            from io import StringIO
-            yield StringIO()
-    
-    file_util.streamlit_write = safe_streamlit_write
-
-    
-    
-    # Monkey patch the metrics gathering function
-    from streamlit.runtime.app_session import AppSession
-    
-    def safe_populate_user_info(self, msg):
-        # Create a dummy user info message
-        from streamlit.proto.Client_pb2 import Client
-        client = Client()
-        client.gather_usage_stats = False
-        client.max_cached_message_age = 0
-        client.session_id = "disabled"
-        client.command_line = ""
-        msg.client.CopyFrom(client)
-        
-        # Create a dummy config state
-        from streamlit.proto.Config_pb2 import Config
-        config = Config()
-        config.gather_usage_stats = False
-        config.max_cached_message_age = 0
-        msg.config.CopyFrom(config)
-        
-        # Add environment information
-        msg.environment_info.streamlit_version = st.__version__
-        msg.environment_info.python_version = sys.version.split()[0]
-    
-    AppSession._populate_user_info_msg = safe_populate_user_info
-    
-except Exception as e:
-    # If patching fails, continue anyway
-    pass
-
-# ----- Enhanced Language Detection -----
-def detect_language(text):
-    """Enhanced Tamil language detection"""
-    if not text:
-        return False
-    
-    # Tamil Unicode range: U+0B80–U+0BFF
-    tamil_range = (0x0B80, 0x0BFF)
-    tamil_chars = 0
-    total_chars = 0
-    
-    for char in text:
-        if char.isalpha():
-            total_chars += 1
-            if ord(char) >= tamil_range[0] and ord(char) <= tamil_range[1]:
-                tamil_chars += 1
-    
-    # If more than 10% of alphabetic characters are Tamil, consider it Tamil
-    if total_chars > 0:
-        tamil_ratio = tamil_chars / total_chars
-        return tamil_ratio > 0.1
-    
-    return False
+# Temp HOME, env vars, config.toml and Streamlit metrics patches; the guard in
+# bootstrap makes this a no-op on every rerun after the first
+cache_base = bootstrap()
 
+# ----- Localized Strings -----
 def get_language_strings(is_tamil=False):
     """Get localized strings based on language"""
     if is_tamil:
@@ -183,172 +70,193 @@ def get_language_strings(is_tamil=False):
         }
 
 # ----- Dataset Loading -----
-@st.cache_data
+@st.cache_resource(show_spinner="Loading question bank...")
+@telemetry.timed("load_quiz_data")
 def load_quiz_data():
+    """Load the question bank once per process.
+    
+    The same read-only QuestionStore is shared by every session and rerun
+    (no per-call pickle copy as with st.cache_data). It is backed by the
+    memory-mapped local snapshot; the hub is only contacted when no snapshot
+    exists yet (or never, in offline mode).
+    """
     try:
-        # Create a temporary directory for dataset caching
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            # Download the Parquet file
-            data_file = hf_hub_download(
-                repo_id='snegha24/Tamil_tnpscExam',
-                filename='train-00000-of-00001.parquet',
-                cache_dir=tmp_dir,
-                repo_type='dataset',
-                subfolder='data'
-            )
-            
-            # Read the Parquet file
-            table = pq.read_table(data_file)
-            df = table.to_pandas()
-            
-            return df
+        return load_question_store()
     except Exception as e:
         st.error(f"Error loading dataset: {str(e)}")
         st.stop()
 
+@st.cache_resource(show_spinner=False)
+def load_explanation_sidecar():
+    """Explanations pre-generated by pregenerate_explanations.py, if any"""
+    return ExplanationSidecar(explanation_sidecar_path(load_quiz_data().path))
+
+@st.cache_resource(show_spinner="Indexing question bank...")
+def load_question_retriever():
+    """BM25 index over question, options and explanation text"""
+    return QuestionRetriever(load_quiz_data())
+
+@st.cache_resource(show_spinner="Finding duplicate questions...")
+def load_question_clusters():
+    """Near-duplicate clusters, saved next to the snapshot after the first build"""
+    clusters = open_question_clusters(load_quiz_data())
+    telemetry.register_collector("question_clusters", clusters.stats)
+    return clusters
+
+@st.cache_resource(show_spinner=False)
+def load_quiz_sampler():
+    """Per-language/subject/difficulty row indexes, built once per process"""
+    return QuizSampler(load_quiz_data(), clusters=load_question_clusters())
+
+@st.cache_resource(show_spinner="Indexing questions for search...")
+def load_question_search():
+    """Character trigram index over question and option text"""
+    return QuestionSearch(load_quiz_data())
+
 # ----- Gemini Helper Functions -----
-def generate_explanation(question, correct_answer, is_tamil=False):
+@st.cache_resource(show_spinner=False)
+def get_llm_client():
+    """One pooled, retrying Gemini client shared by all sessions"""
+    client = LLMClient.from_env()
+    telemetry.register_collector("llm_client", client.stats)
+    telemetry.register_collector("llm_scheduler", client.scheduler.stats)
+    return client
+
+def ai_queue_text(position, eta, is_tamil=False):
+    if is_tamil:
+        return f"⏳ உங்களுக்கு முன் {position} AI கோரிக்கைகள் காத்திருக்கின்றன (சுமார் {eta:.0f} வினாடி)"
+    return f"⏳ {position} AI requests are ahead of yours (about {eta:.0f}s)"
+
+def show_ai_queue(priority, is_tamil=False):
+    """Tell the user up front when their AI request will queue behind others"""
+    scheduler = get_llm_client().scheduler
+    position = scheduler.queue_position(priority)
+    if position:
+        st.info(ai_queue_text(position, scheduler.estimated_wait(priority), is_tamil))
+
+def queue_notice(placeholder, is_tamil=False):
+    """on_wait callback that keeps the caller's queue position in ``placeholder``"""
+    def on_wait(position, eta):
+        if position:
+            placeholder.info(ai_queue_text(position, eta, is_tamil))
+        else:
+            placeholder.empty()
+    return on_wait
+
+@st.cache_resource(show_spinner=False)
+def get_explanation_cache():
+    """Explanations shared by all sessions (in-memory LRU + SQLite on disk)"""
+    cache = TwoTierCache("explanations")
+    telemetry.register_collector("explanation_cache", cache.stats)
+    return cache
+
+@telemetry.timed("helper", helper="explanation")
+def generate_explanation(question, correct_answer, is_tamil=False, on_wait=None):
     """Generate AI explanation with proper language detection"""
     language = "Tamil" if is_tamil else "English"
     
-    prompt = f"""
-    You are an expert Tamil Nadu Public Service Commission (TNPSC) exam tutor.
-    Explain the following question and its correct answer to a student in a clear, concise manner.
-    
-    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
-    If the language is Tamil, use proper Tamil script and avoid English words.
-    If the language is English, use clear English without Tamil words.
+    # The question bank is fixed, so most explanations have been asked for before
+    explanation_cache = get_explanation_cache()
+    key = cache_key(question, correct_answer, language)
+    cached = explanation_cache.get(key)
+    if cached is not None:
+        return cached
     
-    Question: {question}
-    Correct Answer: {correct_answer}
-    
-    Provide a detailed explanation in {language} that includes:
-    - Why this answer is correct
-    - Additional context or background information
-    - Related concepts that might help in understanding
-    
-    Response in {language}:
-    """
+    prompt = explanation_prompt(question, correct_answer, language)
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        text = get_llm_client().generate(prompt, timeout=30, priority=INTERACTIVE, on_wait=on_wait)
+        explanation_cache.put(key, text)
+        return text
     except Exception as e:
         error_msg = f"விளக்கம் உருவாக்க முடியவில்லை: {str(e)}" if is_tamil else f"Could not generate explanation: {str(e)}"
         return error_msg
 
-def generate_study_material(topic):
-    """Generate study material with proper language detection"""
-    is_tamil = detect_language(topic)
-    language = "Tamil" if is_tamil else "English"
-    
-    prompt = f"""
-    You are an expert Tamil Nadu Public Service Commission (TNPSC) exam tutor.
-    Create comprehensive study material on the topic: {topic}
-    
-    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
-    If the language is Tamil, use proper Tamil script exclusively.
-    If the language is English, use clear English exclusively.
-    
-    Include the following sections in {language}:
-    - முக்கிய கருத்துகள் மற்றும் வரையறைகள் (Key concepts and definitions)
-    - வரலாற்று பின்னணி (Historical context - if applicable)
-    - முக்கிய உண்மைகள் மற்றும் புள்ளிவிவரங்கள் (Important facts and figures)
-    - TNPSC தேர்வுகளுக்கான தொடர்பு (Relevance to TNPSC exams)
-    - மாதிரி கேள்விகள் (Sample questions - if applicable)
+# Seconds the review page waits, once per quiz attempt, for explanations still being prefetched
+PREFETCH_REVIEW_WAIT = 2
+
+@st.cache_resource(show_spinner=False)
+def get_explanation_prefetcher():
+    """Generates quiz explanations into the shared cache while the quiz is answered"""
+    client, explanation_cache = get_llm_client(), get_explanation_cache()
     
-    Structure the content with clear headings. Use simple language suitable for exam preparation.
+    def fetch(item):
+        key, question, correct_answer, language = item
+        if explanation_cache.get(key) is None:
+            prompt = explanation_prompt(question, correct_answer, language)
+            explanation_cache.put(key, client.generate(prompt, timeout=120, priority=BACKGROUND))
     
-    Study material in {language}:
-    """
-    try:
-        response = model.generate_content(prompt)
-        return response.text, language
-    except Exception as e:
-        error_msg = f"பாடப்பொருள் உருவாக்க முடியவில்லை: {str(e)}" if is_tamil else f"Could not generate study material: {str(e)}"
-        return error_msg, language
+    prefetcher = Prefetcher(fetch, max_workers=int(os.getenv("TNPSC_PREFETCH_WORKERS", "4")))
+    telemetry.register_collector("explanation_prefetch", prefetcher.stats)
+    return prefetcher
 
-def extract_json(text):
-    """Extract JSON from Gemini response text"""
-    try:
-        # Try to find JSON within ```json ``` blocks
-        json_match = re.search(r'```json(.*?)```', text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(1).strip())
-        
-        # Try to find JSON within ``` ``` blocks
-        json_match = re.search(r'```(.*?)```', text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(1).strip())
-        
-        # Try to parse the entire text as JSON
-        return json.loads(text.strip())
-    except:
-        return None
+def explanation_items(questions):
+    """Prefetch items for the rows of a quiz that have no pre-generated explanation"""
+    sidecar = load_explanation_sidecar()
+    items = []
+    for i in range(questions.num_rows):
+        row = question_at(questions, i)
+        language = "Tamil" if row['is_tamil'].as_py() else "English"
+        if sidecar.get(row['row_id'].as_py(), language) is not None:
+            continue
+        try:
+            answer = correct_option(render_options(row['options']), row['answer'].as_py())
+        except (TypeError, ValueError, IndexError):
+            continue
+        question = row['question'].as_py()
+        items.append((cache_key(question, answer, language), question, answer, language))
+    return items
+
+def cancel_quiz_prefetch():
+    """Drop queued explanation work for the current quiz (abandoned or replaced)"""
+    if st.session_state.get('quiz_prefetch'):
+        get_explanation_prefetcher().cancel(st.session_state.quiz_prefetch)
+
+@st.cache_resource(show_spinner=False)
+def get_study_material_builder():
+    """Study material cached per (topic, language) and shared by all sessions"""
+    cache = TwoTierCache("study_material", memory_entries=256)
+    telemetry.register_collector("study_material_cache", cache.stats)
+    return StudyMaterialBuilder(get_llm_client(), cache)
 
-def generate_quiz_questions(topic, count=10):
-    """Generate quiz questions with proper language detection"""
+@telemetry.timed("helper", helper="study_material")
+def stream_study_material(topic):
+    """Stream study material chunks as they are generated"""
     is_tamil = detect_language(topic)
     language = "Tamil" if is_tamil else "English"
     
-    prompt = f"""
-    Generate {count} multiple-choice questions for TNPSC exam preparation on the topic: {topic}
-    
-    IMPORTANT: All content must be ONLY in {language}. Do not mix languages.
-    If generating in Tamil, use proper Tamil script exclusively.
-    If generating in English, use clear English exclusively.
-    
-    Format each question as a JSON object with the following keys:
-    - "question": the question text in {language}
-    - "options": array of exactly 4 options in {language}
-    - "answer": the correct answer (must be one of the 4 options, exact match)
-    - "explanation": a brief explanation in {language} of why this is the correct answer
-    
-    Example format:
-    [
-        {{
-            "question": "Question text in {language}",
-            "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
-            "answer": "Option 2",
-            "explanation": "Explanation in {language}"
-        }}
-    ]
-    
-    Return ONLY a valid JSON array. No other text before or after.
-    """
+    def error_text(name, e):
+        return f"பாடப்பொருள் உருவாக்க முடியவில்லை ({name}): {str(e)}" if is_tamil else f"Could not generate study material ({name}): {str(e)}"
+    
+    stream = get_study_material_builder().stream(topic, language, on_error=error_text)
     try:
-        response = model.generate_content(prompt)
-        questions = extract_json(response.text)
-        
-        if questions and isinstance(questions, list):
-            # Validate each question
-            valid_questions = []
-            for q in questions:
-                if (isinstance(q, dict) and 
-                    'question' in q and 'options' in q and 
-                    'answer' in q and 'explanation' in q and
-                    isinstance(q['options'], list) and len(q['options']) == 4 and
-                    q['answer'] in q['options']):
-                    valid_questions.append(q)
-            
-            return valid_questions, language
-        else:
-            st.error(f"Failed to extract valid JSON: {response.text[:200]}...")
-            return [], language
-    except Exception as e:
-        st.error(f"Failed to generate questions: {str(e)}")
-        return [], language
+        yield from stream
+    finally:
+        # Stops the upstream calls if the user navigates away mid-stream
+        stream.close()
+
+@st.cache_resource(show_spinner=False)
+def get_quiz_generator():
+    """Sharded, streaming quiz generator on the shared LLM client"""
+    generator = QuizGenerator(get_llm_client())
+    telemetry.register_collector("quiz_generator", generator.stats)
+    return generator
+
+@telemetry.timed("helper", helper="quiz_questions")
+def stream_quiz_questions(topic, count=10):
+    """Yield validated quiz questions one by one as the shards produce them"""
+    language = "Tamil" if detect_language(topic) else "English"
+    yield from get_quiz_generator().stream(topic, count, language)
 
 # ----- Session Initialization -----
 def init_session():
     session_defaults = {
-        'current_index': 0,
-        'score': 0,
-        'user_answers': {},
-        'show_results': False,
         'quiz_started': False,
-        'quiz_questions': None,
+        'quiz': None,  # QuizAttempt: row ids and chosen options of the current quiz
+        'seen_questions': None,  # Bitmap of questions already served this session
+        'quiz_prefetch': None,  # Batch id of the current quiz's explanation prefetch
+        'quiz_review_waited': None,  # Batch whose review already waited for the prefetch
         'chat_open': False,
-        'chat_history': [],
+        'chat_history': None,
         'page': 'home',
         'personalized_topics': '',
         'personalized_material': '',
@@ -361,67 +269,126 @@ def init_session():
     for key, value in session_defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    if st.session_state.chat_history is None:
+        st.session_state.chat_history = ChatHistory()
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole app when it ran as part of one"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # scope="fragment" is only valid while Streamlit is rerunning just the fragment
+        st.rerun()
+
+# ----- Answer Analytics -----
+@st.cache_resource(show_spinner=False)
+def get_answer_log():
+    """Answer events and dashboard aggregates, shared by all sessions"""
+    log = AnswerLog()
+    telemetry.register_collector("answer_log", log.stats)
+    return log
+
+def current_user():
+    """Anonymous id kept in the URL (?user=...), so progress outlives the session"""
+    if 'user_id' not in st.session_state:
+        user = st.query_params.get("user", "")
+        if not re.fullmatch(r"[0-9A-Za-z_-]{1,64}", user):
+            user = uuid.uuid4().hex[:16]
+            st.query_params["user"] = user
+        st.session_state.user_id = user
+    return st.session_state.user_id
+
+def record_answer(source, correct, row_id=None, language=None, subject=None):
+    if row_id is not None:
+        # Near-duplicates count as one question in the history
+        row_id = load_question_clusters().canonical_row(row_id)
+    get_answer_log().record(current_user(), source, correct, row_id=row_id,
+                            language=language, subject=subject)
 
 # ----- Chatbot Functions -----
-def handle_chat_query(query):
-    """Handle chat queries with Gemini with proper language detection"""
+@st.cache_resource(show_spinner=False)
+def get_chat_cache():
+    """Tutor answers shared by all sessions, matched on near-duplicate queries"""
+    cache = NearDuplicateCache(threshold=float(os.getenv("TNPSC_CHAT_CACHE_SIMILARITY", "0.85")))
+    telemetry.register_collector("chat_cache", cache.stats)
+    return cache
+
+@telemetry.timed("helper", helper="chat")
+def stream_chat_query(query):
+    """Stream the tutor's reply chunk by chunk"""
     if not query.strip():
-        return "Please ask a question about TNPSC exam preparation."
+        yield "Please ask a question about TNPSC exam preparation."
+        return
     
     is_tamil = detect_language(query)
     language = "Tamil" if is_tamil else "English"
     
-    prompt = f"""
-    You are an expert tutor for Tamil Nadu Public Service Commission (TNPSC) exams.
-    
-    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
-    If the user asked in Tamil, respond completely in Tamil using proper Tamil script.
-    If the user asked in English, respond completely in English.
-    
-    Answer the following question in a helpful, educational manner. 
-    If the question is not related to TNPSC exams, politely decline to answer and redirect to TNPSC topics.
+    # Popular questions (and light rewordings of them) are answered from cache
+    chat_cache = get_chat_cache()
+    cached = chat_cache.get(query)
+    if cached is not None:
+        telemetry.count("chat_answers", source="cache")
+        yield cached
+        return
     
-    User Question: {query}
+    # Ground the answer in the question bank; an exact bank question is answered directly
+    retriever = load_question_retriever()
+    hits = retriever.search(query, k=3)
+    match = retriever.exact_match(query, hits)
+    if match is not None:
+        telemetry.count("chat_answers", source="bank")
+        strings = get_language_strings(is_tamil)
+        answer = f"**{match['question']}**\n\n**{strings['correct_answer']}** {match['answer']}"
+        if match['explanation']:
+            answer += f"\n\n{match['explanation']}"
+        yield answer
+        return
     
-    Response in {language}:
-    """
+    prompt = chat_prompt(query, language, retriever.context(hits))
+    telemetry.count("chat_answers", source="llm")
+    show_ai_queue(INTERACTIVE, is_tamil)
+    stream = get_llm_client().stream(prompt, timeout=45, priority=INTERACTIVE)
+    chunks = []
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        chat_cache.put(query, "".join(chunks))
     except Exception as e:
         error_msg = f"மன்னிக்கவும், உங்கள் கோரிக்கையை செயல்படுத்த முடியவில்லை: {str(e)}" if is_tamil else f"Sorry, I couldn't process your request: {str(e)}"
-        return error_msg
+        yield error_msg
+    finally:
+        stream.close()
 
 # ----- Interactive Quiz Component -----
-def display_interactive_quiz(quiz_df, language="English"):
-    """Display generated quiz in interactive format"""
+@st.fragment
+@telemetry.timed("fragment", fragment="personalized_quiz")
+def display_interactive_quiz(questions, language="English"):
+    """Display generated quiz in interactive format
+    
+    Runs as a fragment, so answering a question does not re-send the study
+    material above it. ``questions`` are GeneratedQuestion records.
+    """
     if st.session_state.personalized_quiz_state is None:
-        st.session_state.personalized_quiz_state = {
-            'current_index': 0,
-            'score': 0,
-            'user_answers': {},
-            'show_results': False
-        }
+        st.session_state.personalized_quiz_state = AnswerSheet(len(questions))
     
     state = st.session_state.personalized_quiz_state
-    questions = quiz_df.to_dict('records')
     is_tamil = language == "Tamil"
     strings = get_language_strings(is_tamil)
     
-    if not state['show_results']:
+    if not state.show_results:
         # Quiz in progress
-        idx = state['current_index']
+        idx = state.current_index
         question = questions[idx]
         
         with st.form(key=f'personalized_quiz_{idx}'):
             st.subheader(f"{strings['question']} {idx+1}")
-            st.markdown(f"**{question['question']}**")
+            st.markdown(f"**{question.question}**")
             
             # Display options
-            options = question['options']
             user_answer = st.radio(
                 strings['select'], 
-                options, 
+                question.options, 
                 index=None,
                 key=f"personalized_option_{idx}",
                 label_visibility="collapsed"
@@ -433,33 +400,19 @@ def display_interactive_quiz(quiz_df, language="English"):
                 if user_answer is None:
                     st.warning(strings['warning'])
                 else:
-                    # Record answer
-                    state['user_answers'][idx] = {
-                        'question': question['question'],
-                        'user_answer': user_answer,
-                        'correct_answer': question['answer'],
-                        'is_correct': user_answer == question['answer'],
-                        'explanation': question.get('explanation', 'No explanation available')
-                    }
-                    
-                    # Update score
-                    if user_answer == question['answer']:
-                        state['score'] += 1
-                    
-                    # Move to next or show results
-                    if idx < len(questions) - 1:
-                        state['current_index'] += 1
-                    else:
-                        state['show_results'] = True
-                    st.rerun()
+                    # Record the option index, update the score, move on
+                    choice = question.options.index(user_answer)
+                    state.answer(choice, question.answer_index)
+                    record_answer('personalized', choice == question.answer_index, language=language)
+                    rerun_fragment()
     
     else:
         # Results screen
         st.balloons()
-        st.success(f"🎉 {strings['quiz_completed']} {strings['your_score']} {state['score']}/{len(questions)}")
+        st.success(f"🎉 {strings['quiz_completed']} {strings['your_score']} {state.score}/{len(questions)}")
         
         # Performance message
-        score_percent = state['score'] / len(questions)
+        score_percent = state.score / len(questions)
         if score_percent >= 0.8:
             st.success(strings['excellent'])
         elif score_percent >= 0.6:
@@ -469,26 +422,28 @@ def display_interactive_quiz(quiz_df, language="English"):
         
         # Detailed review
         st.subheader(strings['explanations'])
-        for idx, ans in state['user_answers'].items():
+        for idx, choice in state.answered():
+            question = questions[idx]
             with st.expander(f"{strings['question']} {idx+1}", expanded=False):
-                st.markdown(f"**{ans['question']}**")
+                st.markdown(f"**{question.question}**")
                 
-                if ans['is_correct']:
-                    st.success(f"**{strings['your_answer']}** ✅ {ans['user_answer']}")
+                if choice == question.answer_index:
+                    st.success(f"**{strings['your_answer']}** ✅ {question.options[choice]}")
                 else:
-                    st.error(f"**{strings['your_answer']}** ❌ {ans['user_answer']}")
-                    st.info(f"**{strings['correct_answer']}** {ans['correct_answer']}")
+                    st.error(f"**{strings['your_answer']}** ❌ {question.options[choice]}")
+                    st.info(f"**{strings['correct_answer']}** {question.answer}")
                 
-                st.markdown(f"**விளக்கம் / Explanation:** {ans['explanation']}")
+                st.markdown(f"**விளக்கம் / Explanation:** {question.explanation}")
         
         # Restart options
         st.divider()
         if st.button(strings['take_again'], type="primary", use_container_width=True):
             # Reset quiz state
             st.session_state.personalized_quiz_state = None
-            st.rerun()
+            rerun_fragment()
 
 # ----- Personalized Study Section -----
+@telemetry.timed("section", section="personalized")
 def personalized_study_section():
     """Section for personalized study and quiz generation"""
     st.header("Personalized TNPSC Study Plan / தனிப்பயனாக்கப்பட்ட TNPSC படிப்பு திட்டம்")
@@ -500,35 +455,57 @@ def personalized_study_section():
         
         submitted = st.form_submit_button("Generate Study Material / படிப்பு பொருள் உருவாக்கவும்")
         
+        generate_now = False
         if submitted:
             if not topics.strip():
                 st.warning("Please enter at least one topic to study / தயவு செய்து குறைந்தது ஒரு தலைப்பையும் உள்ளிடவும்")
             else:
-                with st.spinner("Generating study material... / படிப்பு பொருள் உருவாக்கப்படுகிறது..."):
-                    st.session_state.personalized_topics = topics
-                    material, lang = generate_study_material(topics)
-                    st.session_state.personalized_material = material
-                    st.session_state.personalized_language = lang
+                st.session_state.personalized_topics = topics
+                generate_now = True
     
-    if st.session_state.personalized_material:
+    if generate_now:
+        # Stream the material in place; later reruns render the stored copy
+        st.subheader(f"Study Material for / படிப்பு பொருள்: {st.session_state.personalized_topics}")
+        st.session_state.personalized_language = "Tamil" if detect_language(topics) else "English"
+        show_ai_queue(STUDY, st.session_state.personalized_language == "Tamil")
+        topic_count = len(split_topics(topics))
+        if topic_count > MAX_TOPICS:
+            st.warning(f"Only the first {MAX_TOPICS} of {topic_count} topics are covered; generate the rest separately. / "
+                       f"{topic_count} தலைப்புகளில் முதல் {MAX_TOPICS} மட்டுமே உள்ளடக்கப்பட்டுள்ளன.")
+        st.session_state.personalized_material = st.write_stream(stream_study_material(topics))
+    elif st.session_state.personalized_material:
         st.subheader(f"Study Material for / படிப்பு பொருள்: {st.session_state.personalized_topics}")
         st.markdown(st.session_state.personalized_material, unsafe_allow_html=True)
-        
+    
+    if st.session_state.personalized_material:
         st.divider()
         st.subheader("Generate Quiz on These Topics / இந்த தலைப்புகளில் வினாடி வினா உருவாக்கவும்")
         button_text = "10 வினாடி வினா கேள்விகளை உருவாக்கவும்" if st.session_state.personalized_language == "Tamil" else "Generate 10 Quiz Questions"
         
         if st.button(button_text, type="primary"):
-            with st.spinner("Generating quiz questions... / வினாடி வினா கேள்விகள் உருவாக்கப்படுகின்றன..."):
-                questions, lang = generate_quiz_questions(st.session_state.personalized_topics, 10)
-                if questions:
-                    st.session_state.personalized_quiz = pd.DataFrame(questions)
-                    st.session_state.personalized_language = lang
-                    success_text = "வினாடி வினா வெற்றிகரமாக உருவாக்கப்பட்டது! கீழே ஸ்க்ரோல் செய்து வினாடி வினாவை எடுக்கவும்" if lang == "Tamil" else "Quiz generated successfully! Scroll down to take the quiz"
-                    st.success(success_text)
-                else:
-                    error_text = "வினாடி வினா கேள்விகளை உருவாக்க முடியவில்லை. மீண்டும் முயற்சிக்கவும்." if st.session_state.personalized_language == "Tamil" else "Failed to generate quiz questions. Please try again."
-                    st.error(error_text)
+            # Show each question as soon as its shard has produced it
+            lang = st.session_state.personalized_language
+            show_ai_queue(STUDY, lang == "Tamil")
+            progress = st.progress(0.0, text="Generating quiz questions... / வினாடி வினா கேள்விகள் உருவாக்கப்படுகின்றன...")
+            preview = st.container()
+            questions = []
+            try:
+                for question in stream_quiz_questions(st.session_state.personalized_topics, 10):
+                    questions.append(question)
+                    progress.progress(len(questions) / 10, text=f"{len(questions)}/10")
+                    preview.markdown(f"**{len(questions)}.** {question['question']}")
+            except Exception as e:
+                st.error(f"Failed to generate questions: {str(e)}")
+            progress.empty()
+            
+            if questions:
+                st.session_state.personalized_quiz = tuple(map(GeneratedQuestion.from_dict, questions))
+                st.session_state.personalized_quiz_state = None
+                success_text = "வினாடி வினா வெற்றிகரமாக உருவாக்கப்பட்டது! கீழே ஸ்க்ரோல் செய்து வினாடி வினாவை எடுக்கவும்" if lang == "Tamil" else "Quiz generated successfully! Scroll down to take the quiz"
+                st.success(success_text)
+            else:
+                error_text = "வினாடி வினா கேள்விகளை உருவாக்க முடியவில்லை. மீண்டும் முயற்சிக்கவும்." if lang == "Tamil" else "Failed to generate quiz questions. Please try again."
+                st.error(error_text)
     
     if st.session_state.personalized_quiz is not None:
         st.divider()
@@ -538,56 +515,96 @@ def personalized_study_section():
                                 st.session_state.personalized_language)
 
 # ----- Main Quiz Function -----
+@telemetry.timed("section", section="quiz")
 def main_quiz():
     st.title('TNPSC Exam Quiz 🔥')
     st.subheader('Test your knowledge with TNPSC questions')
     
     try:
-        df = load_quiz_data()
-        st.sidebar.success(f"Loaded {len(df)} questions")
+        store = load_quiz_data()
+        sampler = load_quiz_sampler()
+        st.sidebar.success(f"Loaded {len(store)} questions")
     except Exception as e:
         st.error(f"Critical error loading data: {str(e)}")
         st.stop()
     
+    quiz_fragment(store, sampler)
+
+@st.fragment
+@telemetry.timed("fragment", fragment="quiz")
+def quiz_fragment(store, sampler):
+    """Start screen, questions and results; interactions rerun only this fragment"""
     # Start quiz button
     if not st.session_state.quiz_started:
         st.info("This quiz will test your knowledge of Tamil Nadu Public Service Commission exam topics.")
+        
+        # Optional filters over the precomputed indexes
+        language_options = {"Tamil & English / தமிழ் & ஆங்கிலம்": None, "Tamil / தமிழ்": "tamil", "English / ஆங்கிலம்": "english"}
+        filters = {'language': language_options[st.selectbox("Question language / கேள்வி மொழி", list(language_options))]}
+        for facet in ('subject', 'difficulty'):
+            values = sampler.facet_values(facet)
+            if values:
+                choice = st.selectbox(facet.title(), ["All"] + values)
+                filters[facet] = None if choice == "All" else choice
+        
         if st.button('Start Quiz', type="primary", use_container_width=True):
             st.session_state.quiz_started = True
             try:
-                st.session_state.quiz_questions = df.sample(10).reset_index(drop=True)
+                seen = st.session_state.seen_questions
+                if seen is None or seen.size != len(store):
+                    seen = st.session_state.seen_questions = sampler.new_seen_bitmap()
+                row_ids = sampler.sample(10, seen=seen, **filters)
+                if len(row_ids) == 0:
+                    raise ValueError("No questions match the selected filters")
+                st.session_state.quiz = QuizAttempt(row_ids)
+                cancel_quiz_prefetch()
+                st.session_state.quiz_prefetch = uuid.uuid4().hex
             except Exception as e:
                 st.error(f"Failed to sample questions: {str(e)}")
                 st.session_state.quiz_started = False
-            st.rerun()
+            rerun_fragment()
         return
 
+    # Only row ids live in the session; the rows come from the shared store
+    quiz = st.session_state.quiz
+    questions = store.take(quiz.row_ids)
+    
     # Quiz in progress
-    if not st.session_state.show_results:
+    if not quiz.show_results:
+        # Explanations are generated in the background while the user answers;
+        # re-queued here if leaving the page cancelled them
+        if st.session_state.quiz_prefetch is None:
+            st.session_state.quiz_prefetch = uuid.uuid4().hex
         try:
-            question_row = st.session_state.quiz_questions.iloc[st.session_state.current_index]
+            get_explanation_prefetcher().prefetch(st.session_state.quiz_prefetch, explanation_items(questions))
+        except Exception:
+            pass  # The review page falls back to the per-question button
+        
+        try:
+            question_row = question_at(questions, quiz.current_index)
         except Exception as e:
             st.error(f"Error loading question: {str(e)}")
-            st.session_state.show_results = True
+            quiz.show_results = True
             return
         
-        # Detect language for this question
-        is_tamil = detect_language(question_row['question'])
+        # Language was precomputed for the whole bank at load time
+        question_text = question_row['question'].as_py()
+        is_tamil = question_row['is_tamil'].as_py()
         strings = get_language_strings(is_tamil)
         
-        with st.form(key=f'main_quiz_form_{st.session_state.current_index}'):
-            st.subheader(f"{strings['question']} {st.session_state.current_index + 1}")
-            st.markdown(f"**{question_row['question']}**")
+        with st.form(key=f'main_quiz_form_{quiz.current_index}'):
+            st.subheader(f"{strings['question']} {quiz.current_index + 1}")
+            st.markdown(f"**{question_text}**")
             
-            # Get options from the list
-            options = question_row['options']
+            # Options stay in Arrow until they are rendered
+            options = render_options(question_row['options'])
             
             # Display options
             user_answer = st.radio(
                 strings['select'], 
                 options, 
                 index=None,
-                key=f"main_question_{st.session_state.current_index}"
+                key=f"main_question_{quiz.current_index}"
             )
             
             submitted = st.form_submit_button(strings['submit'], type="primary")
@@ -597,43 +614,29 @@ def main_quiz():
                     st.warning(strings['warning'])
                 else:
                     try:
-                        # Get correct answer index (convert to 0-based index)
-                        correct_index = int(question_row['answer']) - 1
-                        correct_answer = options[correct_index]
-                    
-                        # Store user answer
-                        st.session_state.user_answers[st.session_state.current_index] = {
-                            'question': question_row['question'],
-                            'user_answer': user_answer,
-                            'correct_answer': correct_answer,
-                            'explanation': question_row.get('explanation', 'No explanation available'),
-                            'is_correct': user_answer == correct_answer,
-                            'ai_explanation': None,  # Will be generated later
-                            'is_tamil': is_tamil
-                        }
+                        # The dataset's answer is a 1-based option index
+                        correct_index = answer_index(options, question_row['answer'].as_py())
                         
-                        # Update score
-                        if user_answer == correct_answer:
-                            st.session_state.score += 1
-                        
-                        # Move to next question or show results
-                        if st.session_state.current_index < len(st.session_state.quiz_questions) - 1:
-                            st.session_state.current_index += 1
-                        else:
-                            st.session_state.show_results = True
+                        # Record the chosen option index, update the score, move on
+                        choice = options.index(user_answer)
+                        quiz.answer(choice, correct_index)
+                        row_id = question_row['row_id'].as_py()
+                        record_answer('practice', choice == correct_index, row_id=row_id,
+                                      language="Tamil" if is_tamil else "English",
+                                      subject=store.value(row_id, 'subject'))
                     except Exception as e:
                         st.error(f"Error processing answer: {str(e)}")
-                    st.rerun()
+                    rerun_fragment()
     
     # Results screen
     else:
         st.balloons()
-        st.success(f"🎉 Quiz Completed! Your Score: {st.session_state.score}/{len(st.session_state.quiz_questions)}")
+        st.success(f"🎉 Quiz Completed! Your Score: {quiz.score}/{len(quiz)}")
         
         # Progress bar with score percentage
-        score_percent = st.session_state.score / len(st.session_state.quiz_questions)
+        score_percent = quiz.score / len(quiz)
         st.progress(score_percent)
-        st.subheader(f"Score: {st.session_state.score}/{len(st.session_state.quiz_questions)} ({score_percent:.0%})")
+        st.subheader(f"Score: {quiz.score}/{len(quiz)} ({score_percent:.0%})")
         
         # Performance message
         if score_percent >= 0.8:
@@ -645,62 +648,96 @@ def main_quiz():
         
         # Detailed results with expanders
         st.subheader("Question Review")
-        for i, answer_data in st.session_state.user_answers.items():
-            with st.expander(f"Question {i+1}: {answer_data['question'][:50]}...", expanded=False):
+        prefetcher = get_explanation_prefetcher()
+        batch = st.session_state.quiz_prefetch
+        if st.session_state.quiz_review_waited != batch:
+            # Only the first render of the review waits, briefly; later reruns never block
+            st.session_state.quiz_review_waited = batch
+            if prefetcher.pending(batch):
+                with st.spinner("Preparing AI explanations... / AI விளக்கங்கள் தயாராகின்றன..."):
+                    prefetcher.wait(batch, timeout=PREFETCH_REVIEW_WAIT)
+        still_pending = prefetcher.pending(batch)
+        if still_pending:
+            # The rest land in the shared cache; any rerun picks them up, and a
+            # question's button joins its in-flight call instead of starting another
+            st.caption(f"{still_pending} AI explanations are still being prepared. / "
+                       f"{still_pending} AI விளக்கங்கள் இன்னும் தயாராகின்றன.")
+            if st.button("Show new AI explanations / புதிய AI விளக்கங்களைக் காட்டு", key="refresh_explanations"):
+                rerun_fragment()
+        explanation_cache = get_explanation_cache()
+        for i, choice in quiz.answered():
+            question_row = question_at(questions, i)
+            question_text = question_row['question'].as_py()
+            is_tamil = question_row['is_tamil'].as_py()
+            row_id = question_row['row_id'].as_py()
+            options = render_options(question_row['options'])
+            try:
+                correct_index = answer_index(options, question_row['answer'].as_py())
+                correct_answer = options[correct_index]
+            except (TypeError, ValueError, IndexError):
+                correct_index, correct_answer = None, "–"
+            
+            with st.expander(f"Question {i+1}: {question_text[:50]}...", expanded=False):
                 # Display question
-                st.markdown(f"**Question:** {answer_data['question']}")
+                st.markdown(f"**Question:** {question_text}")
                 
                 # Display answers with color coding
                 col1, col2 = st.columns(2)
                 with col1:
-                    if answer_data['is_correct']:
-                        st.success(f"**Your answer:** ✅ {answer_data['user_answer']}")
+                    if choice == correct_index:
+                        st.success(f"**Your answer:** ✅ {options[choice]}")
                     else:
-                        st.error(f"**Your answer:** ❌ {answer_data['user_answer']}")
+                        st.error(f"**Your answer:** ❌ {options[choice]}")
                 
                 with col2:
-                    st.info(f"**Correct answer:** {answer_data['correct_answer']}")
+                    st.info(f"**Correct answer:** {correct_answer}")
+                
+                # Provided explanation (read lazily from the store)
+                explanation = store.explanation(row_id) or 'No explanation available'
+                st.markdown(f"**Explanation:** {explanation}")
                 
-                # Provided explanation
-                st.markdown(f"**Explanation:** {answer_data['explanation']}")
+                # AI-generated explanation: use the pre-generated one when available
+                language = "Tamil" if is_tamil else "English"
+                ai_explanation = (quiz.ai_explanation(i) or load_explanation_sidecar().get(row_id, language)
+                                  or explanation_cache.get(cache_key(question_text, correct_answer, language)))
                 
-                # AI-generated explanation
-                ai_button_text = "விரிவான AI விளக்கம் பெறவும்" if answer_data.get('is_tamil', False) else "Get Detailed AI Explanation"
-                if st.button(ai_button_text, key=f"ai_explain_{i}"):
+                ai_button_text = "விரிவான AI விளக்கம் பெறவும்" if is_tamil else "Get Detailed AI Explanation"
+                if not ai_explanation and st.button(ai_button_text, key=f"ai_explain_{i}"):
                     with st.spinner("Generating AI explanation..."):
-                        ai_explanation = generate_explanation(
-                            answer_data['question'], 
-                            answer_data['correct_answer'],
-                            answer_data.get('is_tamil', False)
-                        )
-                        st.session_state.user_answers[i]['ai_explanation'] = ai_explanation
-                        st.rerun()
+                        on_wait = queue_notice(st.empty(), is_tamil)
+                        quiz.set_ai_explanation(i, generate_explanation(question_text, correct_answer, is_tamil,
+                                                                        on_wait=on_wait))
+                        rerun_fragment()
                 
                 # Display AI explanation if available
-                if answer_data.get('ai_explanation'):
+                if ai_explanation:
                     st.markdown("**AI Explanation:**")
-                    st.markdown(answer_data['ai_explanation'])
+                    st.markdown(ai_explanation)
         
         # Restart quiz button
         st.divider()
         if st.button('Take Quiz Again', type="primary", use_container_width=True):
             # Reset session state
-            st.session_state.current_index = 0
-            st.session_state.score = 0
-            st.session_state.user_answers = {}
-            st.session_state.show_results = False
             st.session_state.quiz_started = False
-            st.session_state.quiz_questions = None
-            st.rerun()
+            st.session_state.quiz = None
+            cancel_quiz_prefetch()
+            st.session_state.quiz_prefetch = None
+            rerun_fragment()
 
 # ----- Chat Section -----
+@telemetry.timed("section", section="chat")
 def chat_section():
     """AI-powered chat for TNPSC queries"""
     st.header("AI TNPSC Tutor / AI TNPSC ஆசிரியர்")
     st.markdown("Ask me anything about TNPSC exam preparation! / TNPSC தேர்வு தயாரிப்பு பற்றி எதையும் கேளுங்கள்!")
-    
+    chat_fragment()
+
+@st.fragment
+@telemetry.timed("fragment", fragment="chat")
+def chat_fragment():
+    """History and input; sending a message reruns only this fragment"""
     # Display chat history
-    for i, (question, answer) in enumerate(st.session_state.chat_history):
+    for question, answer in st.session_state.chat_history:
         with st.chat_message("user"):
             st.markdown(question)
         with st.chat_message("assistant"):
@@ -712,20 +749,199 @@ def chat_section():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate and display AI response
+        # Stream the AI response as it is generated
         with st.chat_message("assistant"):
-            with st.spinner("Thinking... / சிந்தித்துக்கொண்டிருக்கிறேன்..."):
-                response = handle_chat_query(prompt)
-                st.markdown(response)
+            response = st.write_stream(stream_chat_query(prompt))
         
-        # Store in chat history
-        st.session_state.chat_history.append((prompt, response))
+        # Store in chat history (keeps the last 10 exchanges)
+        st.session_state.chat_history.append(prompt, response)
         
-        # Limit chat history to last 10 exchanges
-        if len(st.session_state.chat_history) > 10:
-            st.session_state.chat_history = st.session_state.chat_history[-10:]
+
+# ----- Question Search -----
+SEARCH_PAGE_SIZE = 10
+
+def set_search_page(page):
+    st.session_state.search_page = page
+
+@telemetry.timed("section", section="search")
+def search_section():
+    """Look up questions in the bank by any part of their text, in either script"""
+    st.header("🔍 Search Questions / கேள்விகளைத் தேடுங்கள்")
+    query = st.text_input("Search the question bank / கேள்வி வங்கியில் தேடுங்கள்",
+                          placeholder="e.g. Governor, அரசியலமைப்பு, Article 370",
+                          on_change=set_search_page, args=(0,))
+    if not query.strip():
+        st.info("Type a word or part of a question, in Tamil or English. / தமிழ் அல்லது ஆங்கிலத்தில் ஒரு சொல்லை உள்ளிடவும்.")
+        return
+    
+    store = load_quiz_data()
+    page = st.session_state.get('search_page', 0)
+    try:
+        total, rows, scores = load_question_search().search(query, page, SEARCH_PAGE_SIZE)
+    except Exception as e:
+        st.error(f"Search failed: {str(e)}")
+        return
+    if not total:
+        st.warning("No matching questions. / பொருந்தும் கேள்விகள் இல்லை.")
+        return
+    
+    pages = -(-total // SEARCH_PAGE_SIZE)
+    first = page * SEARCH_PAGE_SIZE
+    st.caption(f"{first + 1}–{first + len(scores)} of {total:,} matches")
+    
+    for i in range(len(scores)):
+        row = question_at(rows, i)
+        question_text = row['question'].as_py()
+        options = render_options(row['options'])
+        with st.expander(f"{first + i + 1}. {question_text}", expanded=i == 0):
+            for letter, option in zip("ABCD", options):
+                st.markdown(f"**{letter}.** {option}")
+            try:
+                st.success(f"**Correct answer:** {correct_option(options, row['answer'].as_py())}")
+            except (TypeError, ValueError, IndexError):
+                pass
+            explanation = store.explanation(row['row_id'].as_py())
+            if explanation:
+                st.markdown(f"**Explanation:** {explanation}")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("← Previous", disabled=page == 0, on_click=set_search_page, args=(page - 1,))
+    with col2:
+        st.markdown(f"<div style='text-align: center'>Page {page + 1} of {pages:,}</div>", unsafe_allow_html=True)
+    with col3:
+        st.button("Next →", disabled=page + 1 >= pages, on_click=set_search_page, args=(page + 1,))
+
+# ----- Home Page -----
+@telemetry.timed("section", section="home")
+def home_section():
+    """Landing page with shortcuts to every section"""
+    st.markdown('<div class="quiz-header"><h1>🏛️ TNPSC Quiz & Study Platform</h1><p>தமிழ்நாடு பொதுப் பணியாளர் தேர்வாணையம்</p></div>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown("### 📝 Practice Quiz")
+        st.markdown("Test your knowledge with authentic TNPSC questions from various subjects.")
+        if st.button("Start Practice Quiz", type="primary"):
+            st.session_state.page = "quiz"
+            st.rerun()
+    
+    with col2:
+        st.markdown("### 🎯 Personalized Study")
+        st.markdown("Generate custom study materials and quizzes based on your chosen topics.")
+        if st.button("Create Study Plan", type="primary"):
+            st.session_state.page = "personalized"
+            st.rerun()
+    
+    with col3:
+        st.markdown("### 💬 AI Tutor")
+        st.markdown("Chat with our AI tutor for instant help with TNPSC exam questions.")
+        if st.button("Ask AI Tutor", type="primary"):
+            st.session_state.page = "chat"
+            st.rerun()
+    
+    # Statistics and info, read from the incrementally maintained aggregates
+    # A locked or unreadable analytics DB only blanks the numbers
+    answer_log = get_answer_log()
+    try:
+        totals = answer_log.totals()
+    except Exception:
+        totals = {'answered': None, 'accuracy': None, 'users': None}
+    st.markdown("---")
+    st.markdown("### 📊 Platform Statistics")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("📚 Total Questions", f"{len(load_quiz_data()):,}")
+    with col2:
+        st.metric("✍️ Answers Recorded", f"{totals['answered']:,}" if totals['answered'] is not None else "–")
+    with col3:
+        st.metric("🌟 Success Rate", f"{totals['accuracy']:.0%}" if totals['accuracy'] is not None else "–")
+    with col4:
+        st.metric("👥 Learners", f"{totals['users']:,}" if totals['users'] is not None else "–")
+    
+    st.markdown("### 📈 Your Progress / உங்கள் முன்னேற்றம்")
+    user = current_user()
+    try:
+        summary = answer_log.user_summary(user)
+    except Exception:
+        col1, col2, col3, col4 = st.columns(4)
+        for column, label in zip((col1, col2, col3, col4), ("Answered", "Accuracy", "Correct Streak", "Day Streak")):
+            with column:
+                st.metric(label, "–")
+        return
+    if not summary['answered']:
+        st.info("Answer a few quiz questions to see your progress here. / உங்கள் முன்னேற்றத்தைக் காண சில கேள்விகளுக்குப் பதிலளிக்கவும்.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Answered", f"{summary['answered']:,}")
+    with col2:
+        st.metric("Accuracy", f"{summary['accuracy']:.0%}")
+    with col3:
+        st.metric("Correct Streak", summary['streak'], help=f"Best: {summary['best_streak']}")
+    with col4:
+        st.metric("Day Streak", summary['day_streak'])
+    
+    # Subject-wise (when the dataset has subjects), language and quiz-type breakdowns
+    columns = st.columns(3)
+    for column, (dimension, title) in zip(columns, (("subject", "By Subject"), ("language", "By Language"),
+                                                    ("source", "By Quiz Type"))):
+        try:
+            rows = answer_log.breakdown(user, dimension)
+        except Exception:
+            rows = []
+        if rows:
+            with column:
+                st.markdown(f"**{title}**")
+                table = pd.DataFrame(rows).rename(columns={'value': dimension})
+                table['accuracy'] = table['accuracy'] * 100
+                st.dataframe(table, hide_index=True, column_config={
+                    'accuracy': st.column_config.NumberColumn(format="%.0f%%")})
+    st.caption("Your progress is linked to this page's address; bookmark it to keep your history.")
+
+# ----- Telemetry Admin View -----
+@telemetry.timed("section", section="telemetry")
+def telemetry_section():
+    """p50/p95/p99 of every span and LLM call, plus cache and client counters"""
+    st.header("📈 Telemetry")
+    snapshot = telemetry.registry.to_dict()
+    
+    st.subheader("Latency and sizes")
+    if snapshot['histograms']:
+        rows = []
+        for h in snapshot['histograms']:
+            labels = ", ".join(f"{k}={v}" for k, v in h['labels'].items())
+            rows.append({'metric': h['name'], 'labels': labels, 'count': h['count'],
+                         'mean': h['mean'], 'p50': h['p50'], 'p95': h['p95'], 'p99': h['p99']})
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+    else:
+        st.info("No measurements yet.")
+    
+    if snapshot['counters']:
+        st.subheader("Counters")
+        st.dataframe(pd.DataFrame([
+            {'metric': c['name'], 'labels': ", ".join(f"{k}={v}" for k, v in c['labels'].items()),
+             'value': c['value']} for c in snapshot['counters']
+        ]), hide_index=True)
+    
+    st.subheader("Caches and clients")
+    for name, stats in snapshot['collectors'].items():
+        st.markdown(f"**{name}**")
+        st.dataframe(pd.DataFrame([stats]), hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Prometheus text", telemetry.registry.prometheus_text(),
+                           file_name="metrics.txt", mime="text/plain")
+    with col2:
+        st.download_button("JSON", json.dumps(snapshot, indent=2),
+                           file_name="metrics.json", mime="application/json")
 
 # ----- Main App -----
+@telemetry.timed("rerun")
 def main():
     # Initialize session
     init_session()
@@ -776,14 +992,20 @@ def main():
         "🏠 Home / முகப்பு": "home",
         "📝 Practice Quiz / பயிற்சி வினாடி வினா": "quiz", 
         "🎯 Personalized Study / தனிப்பயன் படிப்பு": "personalized",
-        "💬 AI Tutor Chat / AI ஆசிரியர் அரட்டை": "chat"
+        "💬 AI Tutor Chat / AI ஆசிரியர் அரட்டை": "chat",
+        "🔍 Search Questions / கேள்வி தேடல்": "search"
     }
+    if telemetry.ENABLED:
+        page_options["📈 Telemetry"] = "telemetry"
     
     selected_page = st.sidebar.selectbox(
         "Choose Section / பிரிவைத் தேர்ந்தெடுக்கவும்:",
         list(page_options.keys())
     )
     st.session_state.page = page_options[selected_page]
+    if st.session_state.page != "quiz":
+        # Leaving mid-quiz stops queued explanation work; returning queues it again
+        cancel_quiz_prefetch()
     
     # Sidebar info
     st.sidebar.markdown("---")
@@ -798,45 +1020,7 @@ def main():
     
     # Main content based on selected page
     if st.session_state.page == "home":
-        # Home page
-        st.markdown('<div class="quiz-header"><h1>🏛️ TNPSC Quiz & Study Platform</h1><p>தமிழ்நாடு பொதுப் பணியாளர் தேர்வாணையம்</p></div>', unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("### 📝 Practice Quiz")
-            st.markdown("Test your knowledge with authentic TNPSC questions from various subjects.")
-            if st.button("Start Practice Quiz", type="primary"):
-                st.session_state.page = "quiz"
-                st.rerun()
-        
-        with col2:
-            st.markdown("### 🎯 Personalized Study")
-            st.markdown("Generate custom study materials and quizzes based on your chosen topics.")
-            if st.button("Create Study Plan", type="primary"):
-                st.session_state.page = "personalized"
-                st.rerun()
-        
-        with col3:
-            st.markdown("### 💬 AI Tutor")
-            st.markdown("Chat with our AI tutor for instant help with TNPSC exam questions.")
-            if st.button("Ask AI Tutor", type="primary"):
-                st.session_state.page = "chat"
-                st.rerun()
-        
-        # Statistics and info
-        st.markdown("---")
-        st.markdown("### 📊 Platform Statistics")
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric("📚 Total Questions", "10,000+")
-        with col2:
-            st.metric("🎯 Subjects Covered", "25+")
-        with col3:
-            st.metric("🌟 Success Rate", "85%")
-        with col4:
-            st.metric("👥 Active Users", "5,000+")
+        home_section()
     
     elif st.session_state.page == "quiz":
         main_quiz()
@@ -847,6 +1031,12 @@ def main():
     elif st.session_state.page == "chat":
         chat_section()
     
+    elif st.session_state.page == "search":
+        search_section()
+    
+    elif st.session_state.page == "telemetry":
+        telemetry_section()
+    
     # Footer
     st.markdown("---")
     st.markdown("""
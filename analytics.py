@@ -0,0 +1,172 @@
+"""Answer history and the aggregates behind the dashboard.
+
+Every submitted answer is appended to an ``answer_events`` table in a SQLite
+file (WAL mode, shared by every process on the host). In the same
+transaction a handful of keyed aggregate rows are updated in place: per-user
+totals and streaks, per-user and global breakdowns by language, subject and
+quiz type, and global totals. Recording an answer is therefore a constant
+number of primary-key upserts however long the history grows, and the
+dashboard reads those rows instead of scanning the events.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from llm_cache import CACHE_DIR
+
+ANALYTICS_DB = os.getenv("TNPSC_ANALYTICS_DB", os.path.join(CACHE_DIR, "analytics.sqlite3"))
+# Seconds added to UTC before cutting days for day streaks (default IST, UTC+05:30)
+DAY_OFFSET = int(os.getenv("TNPSC_DAY_OFFSET", "19800"))
+ALL_USERS = "*"
+DIMENSIONS = ('language', 'subject', 'source')
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS answer_events ("
+    "id INTEGER PRIMARY KEY, ts REAL NOT NULL, user TEXT NOT NULL, source TEXT NOT NULL, "
+    "row_id INTEGER, language TEXT, subject TEXT, correct INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS user_stats ("
+    "user TEXT PRIMARY KEY, answered INTEGER NOT NULL, correct INTEGER NOT NULL, "
+    "streak INTEGER NOT NULL, best_streak INTEGER NOT NULL, "
+    "day INTEGER NOT NULL, day_streak INTEGER NOT NULL, last_ts REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS breakdown ("
+    "user TEXT NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL, "
+    "answered INTEGER NOT NULL, correct INTEGER NOT NULL, "
+    "PRIMARY KEY (user, dimension, value)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS totals ("
+    "name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID",
+)
+
+# New users start at streak 1 / day streak 1; returning users extend or reset them
+_UPSERT_USER = (
+    "INSERT INTO user_stats VALUES (:user, 1, :correct, :correct, :correct, :day, 1, :ts) "
+    "ON CONFLICT (user) DO UPDATE SET "
+    "answered = answered + 1, "
+    "correct = correct + :correct, "
+    "streak = CASE WHEN :correct THEN streak + 1 ELSE 0 END, "
+    "best_streak = MAX(best_streak, CASE WHEN :correct THEN streak + 1 ELSE 0 END), "
+    "day_streak = CASE WHEN :day = day THEN day_streak "
+    "WHEN :day = day + 1 THEN day_streak + 1 ELSE 1 END, "
+    "day = :day, "
+    "last_ts = :ts"
+)
+_UPSERT_BREAKDOWN = (
+    "INSERT INTO breakdown VALUES (?, ?, ?, 1, ?) "
+    "ON CONFLICT (user, dimension, value) DO UPDATE SET "
+    "answered = answered + 1, correct = correct + excluded.correct"
+)
+_ADD_TOTAL = ("INSERT INTO totals VALUES (?, ?) "
+              "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value")
+
+
+def _accuracy(answered, correct):
+    return correct / answered if answered else None
+
+
+class AnswerLog:
+    """Append-only answer events plus incrementally maintained aggregates."""
+
+    def __init__(self, db_path=ANALYTICS_DB, day_offset=DAY_OFFSET):
+        self.db_path = db_path
+        self.day_offset = day_offset
+        self.counters = {'recorded': 0, 'errors': 0}
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._db is None:
+            if self.db_path != ':memory:':
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            # An answer lost in a power cut is acceptable; an fsync per answer is not
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _day(self, ts):
+        """Local day number of a timestamp, for day streaks."""
+        return int((ts + self.day_offset) // 86400)
+
+    def _apply(self, db, user, source, correct, row_id, language, subject, ts):
+        correct = int(bool(correct))
+        db.execute("INSERT INTO answer_events (ts, user, source, row_id, language, subject, correct) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   (ts, user, source, row_id, language, subject, correct))
+        new_user = db.execute("SELECT 1 FROM user_stats WHERE user = ?", (user,)).fetchone() is None
+        db.execute(_UPSERT_USER, {'user': user, 'correct': correct,
+                                  'day': self._day(ts), 'ts': ts})
+        for dimension, value in zip(DIMENSIONS, (language, subject, source)):
+            if value:
+                for who in (user, ALL_USERS):
+                    db.execute(_UPSERT_BREAKDOWN, (who, dimension, str(value), correct))
+        db.executemany(_ADD_TOTAL, [('answered', 1), ('correct', correct), ('users', int(new_user))])
+
+    # ----- Recording -----
+    def record(self, user, source, correct, row_id=None, language=None, subject=None, ts=None):
+        """Append one answer and update every aggregate it touches.
+
+        ``row_id`` is the canonical row of the question's near-duplicate
+        cluster (``dedup.QuestionClusters.canonical_row``), so reworded
+        copies of a question share one history.
+        """
+        self.record_many([(user, source, correct, row_id, language, subject, ts)])
+
+    def record_many(self, events):
+        """Record ``(user, source, correct, row_id, language, subject, ts)`` tuples in one transaction."""
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._connection()
+                with db:
+                    count = 0
+                    for user, source, correct, row_id, language, subject, ts in events:
+                        self._apply(db, user, source, correct, row_id, language, subject,
+                                    now if ts is None else ts)
+                        count += 1
+                self.counters['recorded'] += count
+            except (sqlite3.Error, OSError):
+                # Analytics must never break a quiz (OSError: cache dir missing or read-only)
+                self.counters['errors'] += 1
+
+    # ----- Dashboard Queries -----
+    def user_summary(self, user):
+        """Totals, accuracy and streaks for one user (zeros when unknown)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT answered, correct, streak, best_streak, day, day_streak, last_ts "
+                "FROM user_stats WHERE user = ?", (user,)).fetchone()
+        if row is None:
+            return {'answered': 0, 'correct': 0, 'accuracy': None, 'streak': 0,
+                    'best_streak': 0, 'day_streak': 0, 'last_answered_at': None}
+        answered, correct, streak, best_streak, day, day_streak, last_ts = row
+        # A day streak is only current if the user practiced today or yesterday
+        if self._day(time.time()) - day > 1:
+            day_streak = 0
+        return {'answered': answered, 'correct': correct, 'accuracy': _accuracy(answered, correct),
+                'streak': streak, 'best_streak': best_streak, 'day_streak': day_streak,
+                'last_answered_at': last_ts}
+
+    def breakdown(self, user=ALL_USERS, dimension='language'):
+        """``[{value, answered, correct, accuracy}]`` for one dimension, most answered first."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT value, answered, correct FROM breakdown WHERE user = ? AND dimension = ? "
+                "ORDER BY answered DESC", (user, dimension)).fetchall()
+        return [{'value': value, 'answered': answered, 'correct': correct,
+                 'accuracy': _accuracy(answered, correct)} for value, answered, correct in rows]
+
+    def totals(self):
+        """Answers, correct answers, accuracy and distinct users across everyone."""
+        with self._lock:
+            values = dict(self._connection().execute("SELECT name, value FROM totals").fetchall())
+        answered, correct = values.get('answered', 0), values.get('correct', 0)
+        return {'answered': answered, 'correct': correct, 'users': values.get('users', 0),
+                'accuracy': _accuracy(answered, correct)}
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
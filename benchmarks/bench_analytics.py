@@ -0,0 +1,75 @@
+"""Answer recording and dashboard reads with millions of logged events.
+
+Seeds an AnswerLog with ``--events`` answers from ``--users`` users, then
+times what the app does per interaction: recording one answer (event append
+plus aggregate upserts, one commit) and the home-page queries. For contrast
+it times computing the same user summary by scanning ``answer_events``,
+which is what the dashboard would cost without the aggregates.
+
+    python benchmarks/bench_analytics.py [--events 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+from analytics import AnswerLog
+
+SUBJECTS = ["Polity", "History", "Geography", "Economy", "Science", "Tamil"]
+
+
+def _events(count, users, rng, start_ts):
+    for i in range(count):
+        yield (f"user{rng.randrange(users)}", rng.choice(("practice", "personalized")),
+               rng.random() < 0.6, rng.randrange(100_000), rng.choice(("Tamil", "English")),
+               rng.choice(SUBJECTS), start_ts + i)
+
+
+def _per_call_ms(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory(prefix="bench-analytics-") as work_dir:
+        log = AnswerLog(os.path.join(work_dir, "analytics.sqlite3"))
+        start = time.perf_counter()
+        batch = 50_000
+        for offset in range(0, args.events, batch):
+            log.record_many(_events(min(batch, args.events - offset), args.users, rng,
+                                    time.time() - args.events + offset))
+        print(f"seeded {args.events:,} events from {args.users:,} users "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        user = "user7"
+        db = log._connection()
+        results = {
+            'record one answer': _per_call_ms(
+                lambda: log.record(user, "practice", rng.random() < 0.6, row_id=1,
+                                   language="Tamil", subject="Polity"), 500),
+            'user summary': _per_call_ms(lambda: log.user_summary(user), 2000),
+            'user subject breakdown': _per_call_ms(lambda: log.breakdown(user, "subject"), 2000),
+            'global totals': _per_call_ms(log.totals, 2000),
+            'user summary by scan': _per_call_ms(lambda: db.execute(
+                "SELECT COUNT(*), SUM(correct) FROM answer_events WHERE user = ?", (user,)).fetchone(), 5),
+            'global totals by scan': _per_call_ms(lambda: db.execute(
+                "SELECT COUNT(*), SUM(correct), COUNT(DISTINCT user) FROM answer_events").fetchone(), 3),
+        }
+        for name, ms in results.items():
+            print(f"{name:<24} {ms:>10.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Upstream LLM calls and latency in a burst of duplicate requests.
+
+``--sessions`` threads each request an explanation (``generate``) and a
+study-material stream (``stream``) for a prompt drawn from a small set of
+popular ones, all within the first ``--spread`` seconds, against a stub
+model with a fixed latency. Runs once without and once with single-flight
+coalescing and reports upstream calls and caller latency.
+
+    python benchmarks/bench_coalescing.py [--sessions 200]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+from llm_client import LLMClient, StubTransport
+
+
+class CountingStub(StubTransport):
+    """Stub model that counts upstream calls and streams in timed chunks."""
+
+    def __init__(self, delay):
+        super().__init__(delay=delay)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _counted(self):
+        with self._lock:
+            self.calls += 1
+
+    def generate(self, prompt, timeout=None, json_schema=None, **options):
+        self._counted()
+        return super().generate(prompt, timeout, json_schema, **options)
+
+    def stream(self, prompt, timeout=None, **options):
+        self._counted()
+        for word in range(10):
+            time.sleep(self.delay / 10)
+            yield f"chunk{word} "
+
+
+def _burst(coalesce, args):
+    transport = CountingStub(args.latency)
+    client = LLMClient(transport, max_workers=args.workers, coalesce=coalesce)
+    rng = random.Random(0)
+    # A few popular prompts take most of the traffic
+    prompts = rng.choices([f"Explain question {i}" for i in range(args.prompts)],
+                          weights=[1 / (i + 1) for i in range(args.prompts)], k=args.sessions)
+    latencies = []
+    lock = threading.Lock()
+
+    def session(prompt, start_at):
+        time.sleep(start_at)
+        start = time.perf_counter()
+        client.generate(prompt)
+        "".join(client.stream(f"Study material: {prompt}"))
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(p, rng.uniform(0, args.spread))) for p in prompts]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {'upstream calls': transport.calls, 'coalesced': client.stats()['coalesced'],
+            'p50 s': latencies[len(latencies) // 2],
+            'p95 s': latencies[int(len(latencies) * 0.95)], 'wall s': wall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {'independent': _burst(False, args), 'single-flight': _burst(True, args)}
+    print(f"{'':<16}" + "".join(f"{name:>16}" for name in results['independent']))
+    for mode, values in results.items():
+        print(f"{mode:<16}" + "".join(
+            f"{value:>16,}" if isinstance(value, int) else f"{value:>16.2f}" for value in values.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Near-duplicate clustering: build time against bank size, recall and false merges.
+
+Each synthetic bank draws 24-word rows (question plus options) from a
+20k-word Tamil and Latin vocabulary with Zipf-like frequencies, then adds
+10% reworded copies of random rows (a word dropped, case changed,
+punctuation added). Recall is the share of copies that land in their
+original's cluster; false merges count original rows joined to another
+original. The shared benchmark fixture is not used: its ten-word vocabulary
+makes every row a near-duplicate of every other.
+
+    python benchmarks/bench_dedup.py [--rows 25000 50000 100000]
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+
+import numpy as np
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+from dedup import find_clusters
+
+
+def _vocabulary(rng, size):
+    letters = "abcdefghijklmnoprstuvwy"
+    tamil = "கசடதபறஙஞணநமனயரலவழளஅஆஇஈஉஊஎஏ"
+    words = set()
+    while len(words) < size:
+        alphabet = tamil if rng.random() < 0.5 else letters
+        words.add("".join(rng.choice(alphabet) for _ in range(rng.randint(3, 9))))
+    return sorted(words)
+
+
+def _bank(num_rows, seed):
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 20_000)
+    # Zipf-like word frequencies, as in real question text
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    documents = []
+    for _ in range(num_rows):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=12 + 4 * 3)
+        documents.append(" ".join(words))
+    copies = []
+    for _ in range(num_rows // 10):
+        original = rng.randrange(num_rows)
+        words = documents[original].split()
+        del words[rng.randrange(len(words))]
+        text = " ".join(words)
+        documents.append(text.upper() if rng.random() < 0.5 else text + " ?")
+        copies.append((original, len(documents) - 1))
+    return documents, copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[25_000, 50_000, 100_000])
+    args = parser.parse_args()
+
+    previous = None
+    for num_rows in args.rows:
+        documents, copies = _bank(num_rows, seed=num_rows)
+        start = time.perf_counter()
+        cluster_ids, canonical = find_clusters(documents)
+        elapsed = time.perf_counter() - start
+
+        originals = cluster_ids[:num_rows]
+        recall = np.mean([cluster_ids[a] == cluster_ids[b] for a, b in copies])
+        false_merges = num_rows - len(np.unique(originals))
+        per_row_us = elapsed / len(documents) * 1e6
+        growth = f", {per_row_us / previous:.2f}x per row vs previous" if previous else ""
+        previous = per_row_us
+        print(f"{len(documents):>8,} rows: {elapsed:6.2f} s ({per_row_us:.0f} us/row{growth}), "
+              f"{cluster_ids.max() + 1:,} clusters, recall {recall:.2%}, "
+              f"false merges {false_merges:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Websocket bytes and CPU per interaction: full reruns vs fragment reruns.
+
+The quiz, the personalized quiz and the chat run as ``st.fragment``s, so in
+the browser an interaction inside one reruns only that fragment. AppTest
+always reruns the whole script, which is what every interaction used to cost;
+this script also replays each interaction the way the browser sends it (a
+rerun request carrying the fragment id) and compares the two. Bytes are the
+serialized ForwardMsgs the server would push over the websocket, CPU is
+the script thread's. AppTest recompiles the script on every run, which a
+server does once; the runs here share one script cache like a server so
+that compiling does not swamp the difference. Runs offline with the stub
+model:
+
+    python benchmarks/bench_fragments.py
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fixtures import REPO_ROOT, write_parquet_fixture
+
+NUM_ROWS = 2_000
+QUESTIONS = 10
+
+
+def _install_runner():
+    """Swap AppTest's script runner for one that can replay fragment reruns."""
+    from streamlit.runtime.scriptrunner import RerunData, ScriptRunnerEvent
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.element_tree import parse_tree_from_messages
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+
+    class MeasuringScriptRunner(LocalScriptRunner):
+        fragment_id = None   # set to rerun just that fragment, as the browser would
+        last = None
+        script_cache = ScriptCache()   # compiled once per process, as on a server
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._script_cache = MeasuringScriptRunner.script_cache
+            MeasuringScriptRunner.last = self
+            self.script_cpu_ms = 0.0
+
+        def _run_script_thread(self):
+            # CPU of the script thread only, not of AppTest parsing the result
+            start = time.thread_time()
+            try:
+                super()._run_script_thread()
+            finally:
+                self.script_cpu_ms = (time.thread_time() - start) * 1000
+
+        def sent_bytes(self):
+            return sum(data['forward_msg'].ByteSize()
+                       for event, data in zip(self.events, self.event_data)
+                       if event == ScriptRunnerEvent.ENQUEUE_FORWARD_MSG)
+
+        def fragment_ids(self):
+            return {data['forward_msg'].delta.fragment_id
+                    for event, data in zip(self.events, self.event_data)
+                    if event == ScriptRunnerEvent.ENQUEUE_FORWARD_MSG
+                    and data['forward_msg'].delta.fragment_id}
+
+        def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+            if self.fragment_id is None:
+                return super().run(widget_state, query_params, timeout, page_hash)
+            # Drop the full rerun queued at construction, which would absorb this one
+            self._requests = ScriptRequests()
+            self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                         fragment_id=self.fragment_id))
+            try:
+                if not self._script_thread:
+                    self.start()
+                require_widgets_deltas(self, timeout)
+            finally:
+                self.join()
+            return parse_tree_from_messages(self.forward_msgs())
+
+    app_test.LocalScriptRunner = MeasuringScriptRunner
+    return MeasuringScriptRunner
+
+
+def _open(page):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(REPO_ROOT, "Tamil.py"), default_timeout=120).run()
+    select = app.sidebar.selectbox[0]
+    app = select.select(next(o for o in select.options if page in o)).run()
+    if app.exception:
+        raise RuntimeError(f"{page} page failed: {app.exception}")
+    return app
+
+
+def _measured(runner, action, fragment_id=None):
+    """(bytes, script CPU ms) for one interaction, optionally as a fragment rerun."""
+    runner.fragment_id = fragment_id
+    try:
+        app = action().run()
+    finally:
+        runner.fragment_id = None
+    if app.exception:
+        raise RuntimeError(str(app.exception))
+    return runner.last.sent_bytes(), runner.last.script_cpu_ms
+
+
+def _answer(app):
+    radio = app.radio[0]
+    radio.set_value(radio.options[0])
+    return next(b for b in app.button if b.label != "Take Quiz Again").click()
+
+
+def _quiz(runner, fragment):
+    app = _open("Practice Quiz")
+    app.button[0].click().run()   # start the quiz
+    fragment_id = next(iter(runner.last.fragment_ids())) if fragment else None
+    return [_measured(runner, lambda: _answer(app), fragment_id) for _ in range(QUESTIONS)]
+
+
+def _personalized_quiz(runner, fragment):
+    app = _open("Personalized")
+    app.text_area[0].input("Indian Polity, Tamil Nadu History")
+    app.button[0].click().run()   # study material
+    next(b for b in app.button if "Quiz" in b.label).click().run()
+    fragment_id = next(iter(runner.last.fragment_ids())) if fragment else None
+    return [_measured(runner, lambda: _answer(app), fragment_id) for _ in range(QUESTIONS)]
+
+
+def _chat(runner, fragment):
+    app = _open("Tutor Chat")
+    app.chat_input[0].set_value("Warm up the retrieval index").run()
+    fragment_id = next(iter(runner.last.fragment_ids())) if fragment else None
+    samples = []
+    for i in range(QUESTIONS):
+        samples.append(_measured(
+            runner, lambda i=i: app.chat_input[0].set_value(f"Powers of the Governor, part {i}"),
+            fragment_id))
+    return samples
+
+
+def _median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    work_dir = tempfile.mkdtemp(prefix="bench-fragments-")
+    os.environ.update({
+        'TNPSC_SNAPSHOT_DIR': os.path.join(work_dir, "snapshots"),
+        'TNPSC_CACHE_DIR': os.path.join(work_dir, "cache"),
+        'TNPSC_OFFLINE': '1',
+        'TNPSC_LLM_STUB': '1',
+    })
+    try:
+        import question_store
+
+        question_store.build_snapshot(write_parquet_fixture(work_dir, NUM_ROWS),
+                                      os.environ['TNPSC_SNAPSHOT_DIR'])
+        runner = _install_runner()
+
+        print(f"{'interaction':<20} {'full KB':>9} {'frag KB':>9} {'saved':>7} "
+              f"{'full CPU ms':>12} {'frag CPU ms':>12} {'saved':>7}")
+        for name, scenario in (("quiz answer", _quiz),
+                               ("personalized answer", _personalized_quiz),
+                               ("chat message", _chat)):
+            full = scenario(runner, fragment=False)
+            frag = scenario(runner, fragment=True)
+            full_kb, frag_kb = (_median([b for b, _ in s]) / 1024 for s in (full, frag))
+            full_cpu, frag_cpu = (_median([c for _, c in s]) for s in (full, frag))
+            print(f"{name:<20} {full_kb:>9.1f} {frag_kb:>9.1f} {1 - frag_kb / full_kb:>7.0%} "
+                  f"{full_cpu:>12.1f} {frag_cpu:>12.1f} {1 - frag_cpu / full_cpu:>7.0%}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Time until the quiz review page has every AI explanation ready.
+
+``--sessions`` threads start over ``--spread`` seconds and each take a
+ten-question quiz, spending ``--think`` seconds per question, against a
+stub model with a fixed latency. Without prefetch the review page generates
+the missing explanations on open; with prefetch they are generated in the
+background while the quiz is answered. An ``--abandon`` share of sessions
+leave their quiz halfway, which cancels their queued explanations.
+
+    python benchmarks/bench_prefetch.py [--sessions 20]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+from llm_client import LLMClient, StubTransport
+from prefetch import Prefetcher
+from rate_limit import BACKGROUND, INTERACTIVE
+
+QUESTIONS = 10
+
+
+class CountingStub(StubTransport):
+    def __init__(self, delay):
+        super().__init__(delay=delay)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None, json_schema=None, **options):
+        with self._lock:
+            self.calls += 1
+        return super().generate(prompt, timeout, json_schema, **options)
+
+
+def _run(prefetch, args):
+    transport = CountingStub(args.latency)
+    client = LLMClient(transport, max_workers=args.workers)
+    cache, lock = {}, threading.Lock()
+
+    def explain(prompt, priority):
+        with lock:
+            if prompt in cache:
+                return cache[prompt]
+        text = client.generate(prompt, priority=priority)
+        with lock:
+            cache[prompt] = text
+        return text
+
+    prefetcher = Prefetcher(lambda prompt: explain(prompt, BACKGROUND),
+                            max_workers=args.prefetch_workers if prefetch else 0)
+    rng = random.Random(0)
+    review_waits = []
+
+    def session(number, start_at, abandons):
+        time.sleep(start_at)
+        prompts = [f"Explain question {number}.{i}" for i in range(QUESTIONS)]
+        prefetcher.prefetch(number, prompts)
+        for i in range(QUESTIONS):
+            time.sleep(args.think)
+            if abandons and i == QUESTIONS // 2:
+                prefetcher.cancel(number)
+                return
+        # Review page: wait for the prefetch, then generate whatever is still missing
+        start = time.perf_counter()
+        prefetcher.wait(number)
+        with ThreadPoolExecutor(max_workers=QUESTIONS) as pool:
+            list(pool.map(lambda p: explain(p, INTERACTIVE), prompts))
+        with lock:
+            review_waits.append(time.perf_counter() - start)
+
+    abandoning = set(rng.sample(range(args.sessions), int(args.sessions * args.abandon)))
+    threads = [threading.Thread(target=session, args=(n, rng.uniform(0, args.spread), n in abandoning))
+               for n in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    review_waits.sort()
+    stats = prefetcher.stats()
+    return {'upstream calls': transport.calls, 'cancelled': stats['cancelled'],
+            'review p50 s': review_waits[len(review_waits) // 2],
+            'review max s': review_waits[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=5.0)
+    parser.add_argument("--think", type=float, default=1.0, help="seconds per question")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--prefetch-workers", type=int, default=4)
+    parser.add_argument("--abandon", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {'on review': _run(False, args), 'prefetched': _run(True, args)}
+    print(f"{'':<12}" + "".join(f"{name:>16}" for name in results['on review']))
+    for mode, values in results.items():
+        print(f"{mode:<12}" + "".join(
+            f"{value:>16,}" if isinstance(value, int) else f"{value:>16.2f}" for value in values.values()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Per-rerun cost of fetching the question bank: st.cache_data vs st.cache_resource.
+
+st.cache_data unpickles a fresh copy of the DataFrame on every call, which
+main_quiz() makes on every rerun; st.cache_resource hands back the shared
+object. Run with:  python benchmarks/bench_question_cache.py
+"""
+import logging
+import time
+
+from fixtures import make_question_table
+
+import streamlit as st
+
+SIZES = (1_000, 10_000, 100_000)
+RERUNS = 20
+
+
+def _per_call_ms(func, reruns=RERUNS):
+    func()  # warm the cache
+    start = time.perf_counter()
+    for _ in range(reruns):
+        func()
+    return (time.perf_counter() - start) / reruns * 1000
+
+
+def main():
+    # Caches work without a running app; silence the "no runtime" warnings
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    frames = {size: make_question_table(size).to_pandas() for size in SIZES}
+
+    @st.cache_data
+    def load_copied(size):
+        return frames[size]
+
+    @st.cache_resource
+    def load_shared(size):
+        return frames[size]
+
+    print(f"{'rows':>8}  {'cache_data (ms)':>16}  {'cache_resource (ms)':>20}")
+    for size in SIZES:
+        before = _per_call_ms(lambda: load_copied(size))
+        after = _per_call_ms(lambda: load_shared(size))
+        print(f"{size:>8}  {before:>16.3f}  {after:>20.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Per-rerun overhead of the app and a temp-directory leak check.
+
+Reports what the one-time setup in bootstrap.py costs when it runs (which
+used to happen on every rerun) against the guarded no-op every rerun now
+pays, then drives the real app through AppTest reruns and checks that they
+create at most one temp directory between them. Exits 1 on a leak.
+Runs offline with the stub model:  python benchmarks/bench_rerun_overhead.py
+"""
+import glob
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fixtures import REPO_ROOT, write_parquet_fixture
+
+RERUNS = 30
+NUM_ROWS = 2_000
+
+
+def _temp_dirs(prefix):
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), prefix + "*")))
+
+
+def _setup_ms(bootstrap_module, fresh, repeats=RERUNS):
+    """Mean cost of bootstrap(); ``fresh`` resets the guard before each call."""
+    created = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if fresh:
+            bootstrap_module._cache_base = None
+        created.append(bootstrap_module.bootstrap())
+    elapsed = (time.perf_counter() - start) / repeats * 1000
+    if fresh:
+        for path in set(created):
+            shutil.rmtree(path, ignore_errors=True)
+        bootstrap_module._cache_base = None
+    return elapsed
+
+
+def main():
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    work_dir = tempfile.mkdtemp(prefix="bench-rerun-")
+    os.environ.update({
+        'TNPSC_SNAPSHOT_DIR': os.path.join(work_dir, "snapshots"),
+        'TNPSC_CACHE_DIR': os.path.join(work_dir, "cache"),
+        'TNPSC_OFFLINE': '1',
+        'TNPSC_LLM_STUB': '1',
+    })
+
+    import bootstrap
+    import question_store
+    from streamlit.testing.v1 import AppTest
+
+    question_store.build_snapshot(write_parquet_fixture(work_dir, NUM_ROWS),
+                                  os.environ['TNPSC_SNAPSHOT_DIR'])
+
+    print(f"setup when run (old per-rerun cost): {_setup_ms(bootstrap, fresh=True):8.3f} ms")
+    before = _temp_dirs(bootstrap.TEMP_PREFIX)
+    bootstrap.bootstrap()
+    print(f"setup when guarded (new per-rerun):  {_setup_ms(bootstrap, fresh=False):8.4f} ms")
+
+    app = AppTest.from_file(os.path.join(REPO_ROOT, "Tamil.py"), default_timeout=60).run()
+    if app.exception:
+        print(f"app failed: {app.exception}")
+        return 1
+    timings = []
+    for _ in range(RERUNS):
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"app rerun: median {timings[len(timings) // 2]:.1f} ms, "
+          f"max {timings[-1]:.1f} ms over {RERUNS} reruns")
+
+    leaked = _temp_dirs(bootstrap.TEMP_PREFIX) - before
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"temp dirs created by {RERUNS + 1} runs: {len(leaked)}")
+    if len(leaked) > 1:
+        print("LEAK: reruns are creating temp directories")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
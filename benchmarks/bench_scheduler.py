@@ -0,0 +1,140 @@
+"""Priority scheduling of model calls under a rate limit, on a fake clock.
+
+A burst of background prefetches and quiz-generation streams arrives at
+t=0; interactive chat and explanation calls keep arriving every few
+seconds while the burst drains through a ``--rpm`` limit and ``--workers``
+slots. The stub model and the scheduler share a ``FakeClock`` advanced by
+this script, so the run takes a few real seconds whatever the simulated
+duration, and every number below is in simulated seconds. The same
+workload is run with priorities and with every call at one priority (FIFO).
+A short check first makes sure an interactive call is still admitted when
+the queue is full of background calls.
+
+    python benchmarks/bench_scheduler.py [--rpm 30]
+"""
+import argparse
+import sys
+import threading
+import time
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+from llm_client import LLMClient, StubTransport
+from rate_limit import (BACKGROUND, INTERACTIVE, PRIORITY_NAMES, STUDY, FakeClock, QueueFull,
+                        RateLimiter, Scheduler)
+
+
+class ClockedStub(StubTransport):
+    """Stub model whose latency passes on the fake clock."""
+
+    def __init__(self, clock, latency):
+        super().__init__()
+        self.clock = clock
+        self.latency = latency
+
+    def generate(self, prompt, timeout=None, json_schema=None, **options):
+        self.clock.sleep(self.latency)
+        return super().generate(prompt, timeout, json_schema, **options)
+
+    def stream(self, prompt, timeout=None, **options):
+        for _ in range(4):
+            self.clock.sleep(self.latency / 4)
+            yield "chunk "
+
+
+def _check_full_queue():
+    """An interactive call gets in, and goes first, while background calls fill the queue."""
+    scheduler = Scheduler(RateLimiter(clock=FakeClock()), max_concurrent=1, max_queue=3)
+    running = scheduler.acquire(BACKGROUND)
+    order = []
+
+    def call(priority, name):
+        try:
+            ticket = scheduler.acquire(priority)
+        except QueueFull:
+            order.append(f"{name} refused")
+            return
+        order.append(name)
+        scheduler.release(ticket)
+
+    threads = [threading.Thread(target=call, args=(BACKGROUND, f"background {i}")) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    while scheduler.stats()['waiting'] < 3:
+        time.sleep(0.001)
+    try:
+        scheduler.acquire(BACKGROUND)
+        raise AssertionError("a fourth background call was queued")
+    except QueueFull:
+        pass
+    threads.append(threading.Thread(target=call, args=(INTERACTIVE, "interactive")))
+    threads[-1].start()
+    while scheduler.stats()['waiting'] < 4 and threads[-1].is_alive():
+        time.sleep(0.001)
+    scheduler.release(running)
+    for thread in threads:
+        thread.join()
+    assert order[0] == "interactive", order
+
+
+def _workload(args):
+    """``(start time, priority, kind, prompt)`` for every simulated call."""
+    calls = [(0.0, BACKGROUND, 'generate', f"prefetch {i}") for i in range(args.background)]
+    calls += [(0.0, STUDY, 'stream', f"quiz shard {i}") for i in range(args.study)]
+    calls += [(5.0 + i * args.chat_every, INTERACTIVE, 'stream' if i % 2 else 'generate', f"chat {i}")
+              for i in range(args.chats)]
+    return calls
+
+
+def _run(args, prioritized):
+    clock = FakeClock()
+    scheduler = Scheduler(RateLimiter(rpm=args.rpm, clock=clock), max_concurrent=args.workers)
+    client = LLMClient(ClockedStub(clock, args.latency), max_workers=args.workers,
+                       timeout=1e6, coalesce=False, scheduler=scheduler)
+    latencies = {priority: [] for priority in PRIORITY_NAMES}
+    lock = threading.Lock()
+
+    def call(start_at, priority, kind, prompt):
+        clock.sleep(start_at)
+        effective = priority if prioritized else STUDY
+        if kind == 'generate':
+            client.generate(prompt, priority=effective)
+        else:
+            "".join(client.stream(prompt, priority=effective))
+        with lock:
+            latencies[priority].append(clock.now() - start_at)
+
+    threads = [threading.Thread(target=call, args=c, daemon=True) for c in _workload(args)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        clock.advance(args.step)
+        time.sleep(0.0005)
+    return latencies, clock.now()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rpm", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=3.0, help="Simulated seconds per call")
+    parser.add_argument("--background", type=int, default=20)
+    parser.add_argument("--study", type=int, default=30)
+    parser.add_argument("--chats", type=int, default=12)
+    parser.add_argument("--chat-every", type=float, default=8.0)
+    parser.add_argument("--step", type=float, default=0.05, help="Fake clock tick (simulated seconds)")
+    args = parser.parse_args()
+
+    _check_full_queue()
+    for prioritized in (False, True):
+        latencies, end = _run(args, prioritized)
+        print(f"{'priority queue' if prioritized else 'single FIFO queue'} "
+              f"(all done at t={end:.0f}s):")
+        for priority, values in latencies.items():
+            values.sort()
+            print(f"  {PRIORITY_NAMES[priority]:<12} {len(values):>3} calls  "
+                  f"p50 {values[len(values) // 2]:7.1f}s  max {values[-1]:7.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
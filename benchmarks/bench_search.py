@@ -0,0 +1,72 @@
+"""Question search: index build time, size and query latency on 100k rows.
+
+Queries are words, substrings and whole questions from the bank in both
+scripts, some with a dropped character. The synthetic bank uses a tiny
+vocabulary, so posting lists are far longer than on real questions; this is
+a worst case for query time. Exits 1 when p95 exceeds the 10 ms budget.
+
+    python benchmarks/bench_search.py [--rows 100000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from fixtures import make_question_table
+from search import NgramIndex
+
+BUDGET_MS = 10.0
+
+
+def _queries(questions, rng, count):
+    queries = []
+    for _ in range(count):
+        text = rng.choice(questions)
+        kind = rng.randrange(4)
+        if kind == 0:
+            queries.append(rng.choice(text.split()))
+        elif kind == 1:
+            start = rng.randrange(max(1, len(text) - 30))
+            queries.append(text[start:start + rng.randint(8, 30)])
+        elif kind == 2:
+            queries.append(text)
+        else:
+            cut = rng.randrange(len(text))
+            queries.append(text[:cut] + text[cut + 1:])   # one character dropped
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=400)
+    args = parser.parse_args()
+
+    table = make_question_table(args.rows, seed=3)
+    questions = table.column('question').to_pylist()
+    options = table.column('options').to_pylist()
+    documents = [" ".join([q] + o) for q, o in zip(questions, options)]
+
+    start = time.perf_counter()
+    index = NgramIndex(documents)
+    print(f"built index over {args.rows:,} rows in {time.perf_counter() - start:.2f} s: "
+          f"{len(index.grams):,} grams, {len(index.doc_ids):,} postings, {index.nbytes / 1e6:.1f} MB")
+
+    rng = random.Random(0)
+    samples = []
+    for query in _queries(questions, rng, args.queries):
+        start = time.perf_counter()
+        index.search(query, page=rng.randrange(3))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p50, p95 = samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+    print(f"query: p50 {p50:.2f} ms, p95 {p95:.2f} ms, max {samples[-1]:.2f} ms "
+          f"over {len(samples)} queries")
+    if p95 > BUDGET_MS:
+        print(f"p95 above the {BUDGET_MS:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Resident memory per concurrent session: legacy vs compact session state.
+
+Builds the state N sessions hold after a finished practice quiz, a finished
+personalized quiz and 10 chat exchanges, once in the old shape (sampled
+Arrow table, per-answer dicts repeating the question text, a DataFrame, a
+list of chat tuples) and once with the records in session_records.py. Each
+shape is built in a fresh child process and measured as the growth of its
+resident set size divided by N, alongside its Python and Arrow allocations.
+
+Chat answers are drawn from a pool of popular questions, as in exam season;
+each session still joins its streamed chunks into a new string, so only
+interning shares them. Generated quizzes are unique per session.
+
+    python benchmarks/bench_session_memory.py [--sessions 2000]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from fixtures import REPO_ROOT, write_parquet_fixture
+
+NUM_ROWS = 20_000
+QUESTIONS = 10
+CHAT_POOL = 200
+CHAT_TURNS = 10
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _generated_quiz(session):
+    return [{'question': f"Session {session} question {i}: which article covers the Governor?",
+             'options': [f"Article {150 + j}" for j in range(4)],
+             'answer': "Article 152",
+             'explanation': f"Explanation {i} for session {session}. " * 6} for i in range(QUESTIONS)]
+
+
+def _chat_exchange(rng):
+    topic = int(rng.integers(CHAT_POOL))
+    chunks = [f"Answer {topic}, part {p}: the Governor's powers under Article 163. " for p in range(30)]
+    return f"Explain the powers of the Governor ({topic})", "".join(chunks)
+
+
+def _legacy_session(store, sampler, rng, session):
+    import pandas as pd
+    from question_store import correct_option, question_at, render_options
+
+    questions = store.take(sampler.sample(QUESTIONS, rng=rng))
+    user_answers = {}
+    for i in range(QUESTIONS):
+        row = question_at(questions, i)
+        options = render_options(row['options'])
+        correct = correct_option(options, row['answer'].as_py())
+        user_answers[i] = {'question': row['question'].as_py(), 'row_id': row['row_id'].as_py(),
+                           'user_answer': options[0], 'correct_answer': correct,
+                           'is_correct': options[0] == correct, 'ai_explanation': None,
+                           'is_tamil': row['is_tamil'].as_py()}
+    generated = _generated_quiz(session)
+    personalized_answers = {i: {'question': q['question'], 'user_answer': q['options'][0],
+                                'correct_answer': q['answer'], 'is_correct': q['options'][0] == q['answer'],
+                                'explanation': q['explanation']} for i, q in enumerate(generated)}
+    return {
+        'quiz_questions': questions, 'user_answers': user_answers,
+        'current_index': QUESTIONS - 1, 'score': 3, 'show_results': True,
+        'personalized_quiz': pd.DataFrame(generated),
+        'personalized_quiz_state': {'current_index': QUESTIONS - 1, 'score': 5,
+                                    'user_answers': personalized_answers, 'show_results': True},
+        'chat_history': [_chat_exchange(rng) for _ in range(CHAT_TURNS)],
+    }
+
+
+def _compact_session(store, sampler, rng, session):
+    from session_records import AnswerSheet, ChatHistory, GeneratedQuestion, QuizAttempt
+
+    quiz = QuizAttempt(sampler.sample(QUESTIONS, rng=rng))
+    personalized = tuple(map(GeneratedQuestion.from_dict, _generated_quiz(session)))
+    sheet = AnswerSheet(len(personalized))
+    for i in range(QUESTIONS):
+        quiz.answer(0, 1)
+        sheet.answer(0, personalized[i].answer_index)
+    history = ChatHistory()
+    for _ in range(CHAT_TURNS):
+        history.append(*_chat_exchange(rng))
+    return {'quiz': quiz, 'personalized_quiz': personalized,
+            'personalized_quiz_state': sheet, 'chat_history': history}
+
+
+def measure(mode, sessions, snapshot):
+    """Run in a child process: per-session bytes for one state shape."""
+    import numpy as np
+    import pyarrow as pa
+    from question_store import QuestionStore
+    from quiz_sampler import QuizSampler
+
+    store = QuestionStore(snapshot)
+    sampler = QuizSampler(store)
+    build = _legacy_session if mode == 'legacy' else _compact_session
+    rng = np.random.default_rng(0)
+    build(store, sampler, rng, -1)   # warm imports and lazy indexes
+
+    gc.collect()
+    rss, arrow = _rss_bytes(), pa.total_allocated_bytes()
+    states = [build(store, sampler, rng, i) for i in range(sessions)]
+    gc.collect()
+    rss, arrow = _rss_bytes() - rss, pa.total_allocated_bytes() - arrow
+
+    # Python allocations on a second batch: tracemalloc's own bookkeeping would inflate RSS
+    traced = max(1, sessions // 10)
+    tracemalloc.start()
+    states = [build(store, sampler, rng, i) for i in range(traced)]
+    python_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        'rss_per_session': rss / sessions,
+        'python_per_session': python_bytes / len(states),
+        'arrow_per_session': arrow / sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--mode", choices=("legacy", "compact"), help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.sessions, args.snapshot)))
+        return 0
+
+    from question_store import build_snapshot
+
+    with tempfile.TemporaryDirectory(prefix="bench-session-") as work_dir:
+        snapshot = build_snapshot(write_parquet_fixture(work_dir, NUM_ROWS),
+                                  os.path.join(work_dir, "snapshots"))
+        results = {}
+        for mode in ("legacy", "compact"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--mode", mode,
+                 "--sessions", str(args.sessions), "--snapshot", snapshot],
+                capture_output=True, text=True, check=True, cwd=REPO_ROOT).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.sessions} sessions, KB per session")
+    print(f"{'state':<10} {'RSS':>9} {'Python':>9} {'Arrow':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['rss_per_session'] / 1024:>9.1f} {r['python_per_session'] / 1024:>9.1f} "
+              f"{r['arrow_per_session'] / 1024:>9.1f}")
+    saved = 1 - results['compact']['rss_per_session'] / results['legacy']['rss_per_session']
+    print(f"resident memory per session: {saved:.0%} less")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
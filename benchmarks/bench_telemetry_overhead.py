@@ -0,0 +1,51 @@
+"""Cost of the telemetry hooks per call, disabled vs enabled.
+
+Disabled is the default (TNPSC_TELEMETRY unset) and should be noise next to
+a rerun. Run with:  python benchmarks/bench_telemetry_overhead.py
+"""
+import time
+
+import fixtures  # noqa: F401  (puts the repo root on sys.path)
+import telemetry
+
+CALLS = 200_000
+
+
+def _per_call_ns(func, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def _span():
+    with telemetry.span("bench", section="x"):
+        pass
+
+
+def _observe():
+    telemetry.observe("bench_value", 0.01, section="x")
+
+
+def main():
+    def plain():
+        pass
+
+    print(f"{'hook':>14}  {'disabled (ns)':>14}  {'enabled (ns)':>13}")
+    for name, hook in (("span", _span), ("observe", _observe)):
+        results = []
+        for enabled in (False, True):
+            telemetry.ENABLED = enabled
+            results.append(_per_call_ns(hook))
+        print(f"{name:>14}  {results[0]:>14.0f}  {results[1]:>13.0f}")
+
+    results = []
+    for enabled in (False, True):
+        telemetry.ENABLED = enabled
+        results.append(_per_call_ns(telemetry.timed("bench")(plain)))
+    print(f"{'timed function':>14}  {results[0]:>14.0f}  {results[1]:>13.0f}")
+    print(f"{'(bare call)':>14}  {_per_call_ns(plain):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Synthetic question-bank fixtures shared by the benchmark scripts."""
+import os
+import random
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Make the app modules importable when running `python benchmarks/<script>.py`
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+TAMIL_WORDS = ["தமிழ்நாடு", "அரசியலமைப்பு", "வரலாறு", "இந்தியா", "சட்டம்",
+               "பொருளாதாரம்", "நதி", "மன்னர்", "ஆண்டு", "கேள்வி"]
+ENGLISH_WORDS = ["Tamil", "Nadu", "constitution", "history", "India", "article",
+                 "economy", "river", "king", "year", "question", "parliament"]
+
+
+def _sentence(rng, words, length):
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def make_question_table(num_rows, seed=0, tamil_share=0.5):
+    """Build an Arrow table shaped like the Hugging Face dataset."""
+    rng = random.Random(seed)
+    questions, options, answers, explanations = [], [], [], []
+    for i in range(num_rows):
+        words = TAMIL_WORDS if rng.random() < tamil_share else ENGLISH_WORDS
+        questions.append(f"{i}. {_sentence(rng, words, 12)}?")
+        options.append([_sentence(rng, words, 3) for _ in range(4)])
+        answers.append(str(rng.randint(1, 4)))
+        explanations.append(_sentence(rng, words, 80))
+    return pa.table({
+        'question': questions,
+        'options': options,
+        'answer': answers,
+        'explanation': explanations,
+    })
+
+
+def write_parquet_fixture(directory, num_rows, seed=0):
+    """Write a synthetic Parquet file and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"questions-{num_rows}.parquet")
+    if not os.path.exists(path):
+        pq.write_table(make_question_table(num_rows, seed), path)
+    return path
@@ -0,0 +1,317 @@
+"""Reproducible benchmark suite for the app's hot paths.
+
+Covers language detection, quiz JSON parsing, question-bank loading (cold
+and warm) from a local Parquet fixture, quiz sampling, and full AppTest
+reruns of the quiz, personalized-study and chat pages. The model is the
+deterministic offline stub and nothing touches the network.
+
+    python benchmarks/suite.py                       # writes benchmarks/results/<time>.json
+    python benchmarks/suite.py --quick --only lang   # fewer repeats, matching cases only
+    python benchmarks/suite.py --compare benchmarks/results/base.json
+    python benchmarks/suite.py --compare base.json --against new.json   # no new run
+
+Compare mode prints old/new medians per case and exits 1 when any case is
+slower by more than ``--threshold`` (and by more than ``--min-delta-ms``).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from fixtures import REPO_ROOT, make_question_table, write_parquet_fixture
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+NUM_ROWS = 20_000
+
+
+# ----- Timing -----
+def measure(func, repeat, warmup=1):
+    """Per-call milliseconds of ``func`` over ``repeat`` runs."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'median_ms': samples[len(samples) // 2],
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'min_ms': samples[0],
+        'runs': len(samples),
+    }
+
+
+# ----- Cases -----
+def bench_language(repeat):
+    from language import detect_language
+
+    tamil = make_question_table(1, seed=1, tamil_share=1.0).column('explanation')[0].as_py()
+    english = make_question_table(1, seed=1, tamil_share=0.0).column('explanation')[0].as_py()
+    inputs = {
+        'short_tamil': tamil[:40],
+        'short_english': english[:40],
+        'long_tamil': tamil * 8,
+        'long_english': english * 8,
+    }
+    return {f"detect_language.{name}": measure(lambda text=text: detect_language(text), repeat * 50)
+            for name, text in inputs.items()}
+
+
+def bench_quiz_json(repeat):
+    from quiz_generator import JSONObjectStream, validate_question
+
+    items = [{'question': f"Question {i} about the Indian constitution?",
+              'options': [f"Option {i}-{j}" for j in range(4)],
+              'answer': f"Option {i}-2",
+              'explanation': "Explanation text. " * 20} for i in range(10)]
+    clean = json.dumps(items, ensure_ascii=False, indent=2)
+    # Fenced, chatty, a trailing comma and a reply cut off mid-explanation
+    messy = ("Here are your questions:\n```json\n"
+             + clean.replace('"Option 3-3"\n    ]', '"Option 3-3",\n    ]', 1)[:-40])
+
+    def parse(payload):
+        def run():
+            parser = JSONObjectStream()
+            found = []
+            for start in range(0, len(payload), 24):   # ~ one streamed chunk
+                found.extend(parser.feed(payload[start:start + 24]))
+            found.extend(parser.finish())
+            return [q for q in map(validate_question, found) if q]
+        return run
+
+    # finish() salvages the last question cut off mid-explanation, so nothing is lost
+    assert len(parse(clean)()) == 10 and len(parse(messy)()) == 10
+    return {
+        'quiz_json.clean': measure(parse(clean), repeat * 10),
+        'quiz_json.messy': measure(parse(messy), repeat * 10),
+    }
+
+
+def bench_load(repeat, work_dir):
+    import streamlit as st
+    from question_store import QuestionStore, build_snapshot
+
+    parquet = write_parquet_fixture(work_dir, NUM_ROWS)
+    counter = iter(range(1_000_000))
+
+    def cold():
+        # Parquet -> Arrow snapshot -> QuestionStore, as on a fresh pod
+        snapshot_dir = os.path.join(work_dir, f"cold-{next(counter)}")
+        QuestionStore(build_snapshot(parquet, snapshot_dir))
+        shutil.rmtree(snapshot_dir)
+
+    snapshot = build_snapshot(parquet, os.path.join(work_dir, "warm"))
+
+    @st.cache_resource
+    def load_quiz_data():
+        return QuestionStore(snapshot)
+
+    return {
+        'load_quiz_data.cold_build': measure(cold, max(3, repeat // 2), warmup=0),
+        'load_quiz_data.cold_open': measure(lambda: QuestionStore(snapshot), repeat),
+        'load_quiz_data.warm': measure(load_quiz_data, repeat * 50),
+    }
+
+
+def bench_sampling(repeat, work_dir):
+    import numpy as np
+    from question_store import QuestionStore, build_snapshot
+    from quiz_sampler import QuizSampler
+
+    store = QuestionStore(build_snapshot(write_parquet_fixture(work_dir, NUM_ROWS),
+                                         os.path.join(work_dir, "warm")))
+    sampler = QuizSampler(store)
+    rng = np.random.default_rng(0)
+    seen = sampler.new_seen_bitmap()
+    return {
+        'quiz_sampler.build': measure(lambda: QuizSampler(store), repeat),
+        'quiz_sampler.sample': measure(lambda: sampler.sample(10, rng=rng), repeat * 50),
+        'quiz_sampler.sample_tamil_seen': measure(
+            lambda: sampler.sample(10, seen=seen, rng=rng, language='tamil'), repeat * 50),
+    }
+
+
+def _app(page):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(REPO_ROOT, "Tamil.py"), default_timeout=120).run()
+    select = app.sidebar.selectbox[0]
+    app = select.select(next(o for o in select.options if page in o)).run()
+    if app.exception:
+        raise RuntimeError(f"{page} page failed: {app.exception}")
+    return app
+
+
+def _timed_run(app, action=None):
+    start = time.perf_counter()
+    (action() if action else app).run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(str(app.exception))
+    return elapsed
+
+
+def bench_pages(repeat):
+    results = {}
+
+    # First visits build per-process indexes (sampler, BM25); they are not what is measured
+    app = _app("Practice Quiz")
+    _timed_run(app, app.button[0].click)       # start a quiz once: builds the sampler
+    idle = [_timed_run(app) for _ in range(repeat)]
+    answers = []
+    for round_number in range(max(1, repeat // 10)):
+        if round_number:
+            _timed_run(app, app.button[0].click)   # start quiz
+        for _ in range(10):
+            radio = app.radio[0]
+            radio.set_value(radio.options[0])
+            answers.append(_timed_run(app, app.button[0].click))
+        _timed_run(app, app.button[-1].click)  # take again
+    results['page.quiz.rerun'] = summarize(idle)
+    results['page.quiz.answer'] = summarize(answers)
+
+    app = _app("Personalized")
+    material, quizzes = [], []
+    for i in range(max(1, repeat // 10)):
+        app.text_area[0].input(f"Indian Polity, Tamil Nadu History, Topic {i}")
+        material.append(_timed_run(app, app.button[0].click))
+        quizzes.append(_timed_run(app, next(b for b in app.button if "Quiz" in b.label).click))
+    results['page.personalized.study_material'] = summarize(material)
+    results['page.personalized.quiz'] = summarize(quizzes)
+
+    app = _app("Tutor Chat")
+    app.chat_input[0].set_value("Warm up the retrieval index")
+    _timed_run(app)
+    chats = []
+    for i in range(repeat):
+        app.chat_input[0].set_value(f"Explain the powers of the Governor, part {i}")
+        chats.append(_timed_run(app))
+    results['page.chat.ask'] = summarize(chats)
+    return results
+
+
+# ----- Results -----
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(quick=False, only=None):
+    repeat = 5 if quick else 20
+    work_dir = tempfile.mkdtemp(prefix="bench-suite-")
+    # The app modules read these at import time
+    os.environ.update({
+        'TNPSC_SNAPSHOT_DIR': os.path.join(work_dir, "app-snapshots"),
+        'TNPSC_CACHE_DIR': os.path.join(work_dir, "cache"),
+        'TNPSC_OFFLINE': '1',
+        'TNPSC_LLM_STUB': '1',
+    })
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    cases = {
+        'language': lambda: bench_language(repeat),
+        'quiz_json': lambda: bench_quiz_json(repeat),
+        'load': lambda: bench_load(repeat, work_dir),
+        'sampling': lambda: bench_sampling(repeat, work_dir),
+        'pages': lambda: bench_pages(repeat),
+    }
+    results = {}
+    try:
+        import question_store
+        question_store.build_snapshot(write_parquet_fixture(work_dir, NUM_ROWS),
+                                      os.environ['TNPSC_SNAPSHOT_DIR'])
+        for name, case in cases.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            print(f"running {name}...", file=sys.stderr)
+            results.update(case())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': NUM_ROWS,
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Print old/new medians; return the names of cases that regressed."""
+    regressions = []
+    print(f"{'case':<40} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        old = baseline['results'].get(name, {}).get('median_ms')
+        new = current['results'].get(name, {}).get('median_ms')
+        if old is None or new is None:
+            old, new = (f"{v:.4f}" if v is not None else "-" for v in (old, new))
+            print(f"{name:<40} {old:>10} {new:>10}")
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold and new - old > min_delta_ms:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {old:>10.4f} {new:>10.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats")
+    parser.add_argument("--only", nargs="+", help="Run only case groups containing these names "
+                        "(language, quiz_json, load, sampling, pages)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a stored results file")
+    parser.add_argument("--against", metavar="RESULTS", help="With --compare: use this file instead of a new run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (default 0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many ms (timer noise)")
+    args = parser.parse_args(argv)
+
+    if args.against:
+        with open(args.against, encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.quick, args.only)
+        output = args.output or os.path.join(
+            RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        for name, stats in sorted(current['results'].items()):
+            print(f"{name:<40} median {stats['median_ms']:>10.4f} ms   p95 {stats['p95_ms']:>10.4f} ms")
+        print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
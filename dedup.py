@@ -0,0 +1,216 @@
+"""Near-duplicate clusters of the question bank.
+
+The dataset repeats many questions verbatim or with trivial rewording. Every
+row's question and option text is reduced to a MinHash signature over its
+character trigrams (the grams ``search.py`` indexes), and LSH
+banding proposes candidate pairs: within each band, rows are sorted by
+bucket and compared with their neighbour only, so the work per band is a
+sort plus one vectorized comparison per row. Candidates whose estimated Jaccard
+similarity reaches the threshold and that mention exactly the same numbers
+are joined into clusters with a vectorized union-find.
+
+The result is computed once per dataset version and stored next to the
+snapshot (``clusters-<version>.npz``), so later loads only read two arrays.
+Rows in different scripts share almost no trigrams, so a Tamil question and
+its English translation stay separate clusters.
+"""
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from question_store import snapshot_version
+from search import question_documents, trigram_occurrences
+
+_PRIME = (1 << 31) - 1
+_NUMBER = re.compile(r"\d+")
+
+# Bands used to order rows inside a bucket, and how many neighbours each row is compared with
+SORT_BANDS = 4
+WINDOW = 2
+
+DEFAULT_PARAMS = {'threshold': 0.8, 'num_perm': 64, 'bands': 16, 'seed': 1}
+
+
+def clusters_path(snapshot_path):
+    """Where the duplicate clusters of a snapshot are stored."""
+    return os.path.join(os.path.dirname(snapshot_path),
+                        f"clusters-{snapshot_version(snapshot_path)}.npz")
+
+
+# ----- MinHash-LSH -----
+def _signatures(documents, num_perm, seed):
+    """``num_perm`` MinHash values per document; rows without grams stay at the maximum."""
+    grams, gram_of, doc_of = trigram_occurrences(documents)
+    signatures = np.full((len(documents), num_perm), _PRIME, dtype=np.uint32)
+    if not len(gram_of):
+        return signatures
+
+    # Occurrences are already grouped by document; repeated grams do not change a minimum
+    starts = np.flatnonzero(np.r_[True, doc_of[1:] != doc_of[:-1]])
+    docs = doc_of[starts]
+    # Multiplicative hash of each distinct gram into [0, 2**31)
+    base = (grams * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(33)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    for k in range(num_perm):
+        hashed = ((a[k] * base + b[k]) % np.uint64(_PRIME)).astype(np.uint32)
+        signatures[docs, k] = np.minimum.reduceat(hashed[gram_of], starts)
+    return signatures
+
+
+def _number_keys(documents):
+    """One integer per document identifying the numbers it mentions."""
+    keys = {}
+    return np.fromiter((keys.setdefault(tuple(_NUMBER.findall(d)), len(keys)) for d in documents),
+                       dtype=np.int64, count=len(documents))
+
+
+def _candidate_pairs(signatures, bands):
+    """Distinct ``(row, previous row)`` pairs of rows sharing an LSH bucket.
+
+    Rows are sorted by their band key and then by the next band's key, so
+    within a bucket the closest rows tend to be neighbours; only neighbours
+    are compared, which keeps the candidates linear in the number of rows.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    keys = np.zeros((bands, n), dtype=np.uint64)
+    for band in range(bands):
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            keys[band] = keys[band] * np.uint64(1_000_003) + column
+    pairs = []
+    for band in range(bands):
+        # The next bands break ties, so the most similar rows of a bucket end up adjacent
+        tie_break = np.zeros(n, dtype=np.uint64)
+        for i in range(1, SORT_BANDS):
+            tie_break = tie_break * np.uint64(1_000_003) + keys[(band + i) % bands]
+        order = np.lexsort((tie_break, keys[band]))
+        band_keys = keys[band][order]
+        for gap in range(1, WINDOW + 1):
+            same = band_keys[gap:] == band_keys[:-gap]
+            pairs.append(order[gap:][same].astype(np.int64) * n + order[:-gap][same])
+    pairs = np.unique(np.concatenate(pairs)) if pairs else np.zeros(0, dtype=np.int64)
+    return pairs // n, pairs % n
+
+
+def _components(n, u, v):
+    """Smallest row id of each row's connected component (hook and compress)."""
+    labels = np.arange(n)
+    while len(u):
+        lu, lv = labels[u], labels[v]
+        if np.array_equal(lu, lv):
+            break
+        low = np.minimum(lu, lv)
+        np.minimum.at(labels, lu, low)
+        np.minimum.at(labels, lv, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def find_clusters(documents, threshold=0.8, num_perm=64, bands=16, seed=1):
+    """``(cluster_ids, canonical)`` arrays: a dense cluster id per document and
+    the smallest row id in its cluster."""
+    assert num_perm % bands == 0
+    documents = list(documents)
+    n = len(documents)
+    if not n:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    signatures = _signatures(documents, num_perm, seed)
+    u, v = _candidate_pairs(signatures, bands)
+    numbers = _number_keys(documents)
+    similar = (signatures[u] == signatures[v]).mean(axis=1) >= threshold
+    similar &= numbers[u] == numbers[v]
+    # Rows without any gram (empty text) never merge
+    similar &= signatures[u, 0] != _PRIME
+    canonical = _components(n, u[similar], v[similar])
+
+    is_root = canonical == np.arange(n)
+    cluster_ids = (np.cumsum(is_root) - 1)[canonical]
+    return cluster_ids.astype(np.int32), canonical.astype(np.int32)
+
+
+# ----- Clusters -----
+class QuestionClusters:
+    """Cluster id and canonical (lowest) row id of every question."""
+
+    def __init__(self, cluster_ids, canonical):
+        self.cluster_ids = cluster_ids
+        self.canonical = canonical
+        self.canonical_rows = np.flatnonzero(canonical == np.arange(len(canonical)))
+
+    def __len__(self):
+        return len(self.cluster_ids)
+
+    @property
+    def num_clusters(self):
+        return len(self.canonical_rows)
+
+    def cluster_of(self, row_id):
+        return int(self.cluster_ids[row_id])
+
+    def canonical_row(self, row_id):
+        """The row that stands for ``row_id``'s cluster in quizzes and analytics."""
+        return int(self.canonical[row_id])
+
+    def members(self, row_id):
+        """All row ids in the same cluster as ``row_id``."""
+        return np.flatnonzero(self.cluster_ids == self.cluster_ids[row_id])
+
+    def stats(self):
+        return {'rows': len(self), 'clusters': self.num_clusters,
+                'duplicate_rows': len(self) - self.num_clusters}
+
+
+def _save(path, cluster_ids, canonical, params):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, cluster_ids=cluster_ids, canonical=canonical,
+                     params=np.array(json.dumps(params, sort_keys=True)))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # Clusters of older dataset versions are never read again
+    keep = os.path.basename(path)
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith("clusters-") and name.endswith(".npz") and name != keep:
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+
+
+def _load(path, num_rows, params):
+    try:
+        with np.load(path) as data:
+            if (str(data['params']) != json.dumps(params, sort_keys=True)
+                    or len(data['canonical']) != num_rows):
+                return None
+            return data['cluster_ids'], data['canonical']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def open_question_clusters(store, **params):
+    """Clusters of a ``QuestionStore``, read from beside its snapshot or built and saved there."""
+    params = {**DEFAULT_PARAMS, **params}
+    path = clusters_path(store.path)
+    cached = _load(path, len(store), params)
+    if cached is None:
+        cached = find_clusters(question_documents(store), **params)
+        try:
+            _save(path, *cached, params)
+        except OSError:
+            pass  # A read-only snapshot directory just means rebuilding next start
+    return QuestionClusters(*cached)
@@ -0,0 +1,154 @@
+"""Tamil script detection and Tamil-aware text normalization.
+
+Detection is vectorized over code points with NumPy.
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pyarrow as pa
+
+# Tamil Unicode range: U+0B80–U+0BFF
+TAMIL_RANGE = (0x0B80, 0x0BFF)
+# If more than 10% of alphabetic characters are Tamil, consider it Tamil
+TAMIL_THRESHOLD = 0.1
+_VECTORIZE_MIN_LENGTH = 64
+
+# str.isalpha() for every code point in the Basic Multilingual Plane
+_IS_ALPHA = np.array([chr(cp).isalpha() for cp in range(0x10000)], dtype=bool)
+
+
+def _alpha_and_tamil(codepoints):
+    """Boolean masks of alphabetic and Tamil-alphabetic code points.
+
+    Code points outside the BMP map to U+FFFF, which is not alphabetic.
+    """
+    alpha = _IS_ALPHA[np.minimum(codepoints, 0xFFFF)]
+    in_range = (codepoints - np.uint32(TAMIL_RANGE[0])) <= (TAMIL_RANGE[1] - TAMIL_RANGE[0])
+    return alpha, alpha & in_range
+
+
+def tamil_ratio(text):
+    """Share of alphabetic characters in ``text`` that are Tamil."""
+    # Plain ASCII can never be Tamil
+    if not text or text.isascii():
+        return 0.0
+    # Below a few dozen characters NumPy's call overhead outweighs the loop
+    if len(text) < _VECTORIZE_MIN_LENGTH:
+        letters = [ord(char) for char in text if char.isalpha()]
+        if not letters:
+            return 0.0
+        tamil = sum(1 for cp in letters if TAMIL_RANGE[0] <= cp <= TAMIL_RANGE[1])
+        return tamil / len(letters)
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    alpha, tamil = _alpha_and_tamil(codepoints)
+    total = np.count_nonzero(alpha)
+    return np.count_nonzero(tamil) / total if total else 0.0
+
+
+def detect_language(text):
+    """Enhanced Tamil language detection"""
+    return tamil_ratio(text) > TAMIL_THRESHOLD
+
+
+# ----- Column-wise Detection -----
+# ASCII letters are the only alphabetic single-byte UTF-8 characters
+_ASCII_ALPHA = np.array([b < 0x80 and chr(b).isalpha() for b in range(256)], dtype=bool)
+
+
+def _utf8_char_flags(data):
+    """Per-byte alphabetic / Tamil flags, set on the lead byte of each character."""
+    alpha = _ASCII_ALPHA[data]
+    tamil = np.zeros(len(data), dtype=bool)
+
+    # Only multi-byte characters need decoding
+    starts = np.flatnonzero(data >= 0xC0)
+    if len(starts):
+        padded = np.concatenate([data, np.zeros(3, dtype=np.uint8)])
+        b0 = padded[starts].astype(np.uint32)
+        b1 = padded[starts + 1].astype(np.uint32) & 0x3F
+        b2 = padded[starts + 2].astype(np.uint32) & 0x3F
+        two_byte = b0 < 0xE0
+        codepoints = np.where(two_byte, ((b0 & 0x1F) << 6) | b1,
+                              ((b0 & 0x0F) << 12) | (b1 << 6) | b2)
+        # 4-byte characters fall outside the BMP and are treated as non-alphabetic
+        codepoints[b0 >= 0xF0] = 0xFFFF
+        char_alpha, char_tamil = _alpha_and_tamil(codepoints)
+        alpha[starts] = char_alpha
+        tamil[starts] = char_tamil
+    return alpha, tamil
+
+
+def _string_chunk_ratio(chunk):
+    num_rows = len(chunk)
+    if num_rows == 0:
+        return np.zeros(0, dtype=np.float32)
+    offset_type = np.int64 if pa.types.is_large_string(chunk.type) else np.int32
+    _, offsets_buf, data_buf = chunk.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=offset_type)[chunk.offset:chunk.offset + num_rows + 1]
+    if data_buf is None or offsets[-1] == offsets[0]:
+        return np.zeros(num_rows, dtype=np.float32)
+    data = np.frombuffer(data_buf, dtype=np.uint8)[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+
+    # Per-row counts from prefix sums over the per-byte flags
+    alpha, tamil = _utf8_char_flags(data)
+    alpha_sum = np.concatenate([[0], np.cumsum(alpha, dtype=np.int64)])
+    tamil_sum = np.concatenate([[0], np.cumsum(tamil, dtype=np.int64)])
+    total = alpha_sum[offsets[1:]] - alpha_sum[offsets[:-1]]
+    tamil_count = tamil_sum[offsets[1:]] - tamil_sum[offsets[:-1]]
+    return np.divide(tamil_count, total, out=np.zeros(num_rows), where=total > 0).astype(np.float32)
+
+
+def tamil_ratio_column(column):
+    """Tamil-character ratio for every string in an Arrow array or chunked array.
+
+    Works directly on the UTF-8 buffers, so no Python string is created.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        chunks = column.chunks
+    else:
+        chunks = [column]
+    ratios = [_string_chunk_ratio(chunk) for chunk in chunks]
+    return np.concatenate(ratios) if ratios else np.zeros(0, dtype=np.float32)
+
+
+def language_columns(column):
+    """Return ``(is_tamil, tamil_ratio)`` arrays for a string column."""
+    ratio = tamil_ratio_column(column)
+    return ratio > TAMIL_THRESHOLD, ratio
+
+
+# ----- Normalization and Tokenization -----
+_WHITESPACE = re.compile(r"\s+")
+# Every BMP punctuation or symbol code point (Unicode categories P* and S*) -> space
+_PUNCTUATION_TO_SPACE = {cp: ' ' for cp in range(0x10000)
+                         if unicodedata.category(chr(cp))[0] in 'PS'}
+# Agglutinative Tamil words also index a short prefix as a crude stem
+TAMIL_STEM_LENGTH = 6
+
+
+def normalize_text(text):
+    """Unicode NFC, case-folded, whitespace-collapsed form of ``text``."""
+    text = unicodedata.normalize('NFC', str(text or ''))
+    return _WHITESPACE.sub(' ', text.casefold()).strip()
+
+
+def normalize_query(text):
+    """``normalize_text`` with punctuation and symbols removed.
+
+    Tamil vowel signs and viramas are combining marks, not punctuation, so
+    they are kept (``\\w`` regexes would split words at them).
+    """
+    text = unicodedata.normalize('NFC', str(text or '')).casefold()
+    return _WHITESPACE.sub(' ', text.translate(_PUNCTUATION_TO_SPACE)).strip()
+
+
+def tokenize(text):
+    """Word tokens of ``text``, plus a prefix stem for long Tamil words."""
+    tokens = []
+    for word in normalize_query(text).split():
+        tokens.append(word)
+        if len(word) > TAMIL_STEM_LENGTH and TAMIL_RANGE[0] <= ord(word[0]) <= TAMIL_RANGE[1]:
+            tokens.append(word[:TAMIL_STEM_LENGTH] + '~')
+    return tokens
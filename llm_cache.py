@@ -0,0 +1,281 @@
+"""Caches for generated LLM text.
+
+``TwoTierCache`` is an in-process LRU shared by every session in front of a
+SQLite file that survives restarts and is shared by every process on the
+host. ``NearDuplicateCache`` matches reworded chat queries with character
+n-gram MinHash and LSH banding. Both expire entries after a TTL and evict
+the oldest past a size bound.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from language import normalize_query, normalize_text
+
+CACHE_DIR = os.getenv(
+    "TNPSC_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+)
+CACHE_DB = os.path.join(CACHE_DIR, "llm_cache.sqlite3")
+
+_NUMBER = re.compile(r"\d+")
+# Writes between size checks of a disk table (the bound may be overshot by this many)
+TRIM_INTERVAL = 64
+
+
+def cache_key(*parts):
+    """Stable key for a tuple of normalized text parts."""
+    payload = json.dumps([normalize_text(p) for p in parts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TwoTierCache:
+    """In-memory LRU in front of a SQLite table, with TTL and hit/miss counters."""
+
+    def __init__(self, namespace, db_path=CACHE_DB, memory_entries=512,
+                 disk_entries=50_000, ttl=30 * 24 * 3600):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite I/O is serialized separately so memory hits never wait on the disk
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._untrimmed = TRIM_INTERVAL  # Check the size on the first write
+        self._table = f"cache_{re.sub(r'[^0-9a-zA-Z_]', '_', namespace)}"
+
+    # ----- SQLite Tier -----
+    def _connection(self):
+        if self._db is None:
+            if self.db_path != ':memory:':
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed "
+                       f"ON {self._table} (accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key, now):
+        db = self._connection()
+        row = db.execute(f"SELECT value, created_at FROM {self._table} WHERE key = ?",
+                         (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if now - created_at > self.ttl:
+            db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+            db.commit()
+            return None
+        db.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+        db.commit()
+        return value, created_at
+
+    def _disk_put(self, key, value, now):
+        db = self._connection()
+        db.execute(f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?, ?, ?)",
+                   (key, value, now, now))
+        self._untrimmed += 1
+        if self._untrimmed >= TRIM_INTERVAL:
+            self._untrimmed = 0
+            count = db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+            if count > self.disk_entries:
+                db.execute(
+                    f"DELETE FROM {self._table} WHERE key IN (SELECT key FROM {self._table} "
+                    "ORDER BY accessed_at LIMIT ?)", (count - self.disk_entries,)
+                )
+        db.commit()
+
+    # ----- Public API -----
+    def get(self, key):
+        """Return the cached value for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        try:
+            with self._db_lock:
+                entry = self._disk_get(key, now)
+        except (sqlite3.Error, OSError):
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            # A put() that landed meanwhile is newer than what was read
+            if key not in self._memory:
+                self._remember(key, entry)
+            return entry[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now))
+            self.counters['writes'] += 1
+        try:
+            with self._db_lock:
+                self._disk_put(key, value, now)
+        except (sqlite3.Error, OSError):
+            # The in-memory tier still serves this process
+            pass
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """Counters plus the overall hit rate."""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+# ----- Near-duplicate Cache -----
+class NearDuplicateCache:
+    """Answers keyed by query text, also matched when reworded slightly.
+
+    Each query is normalized (``normalize_query``), split into character
+    n-grams and reduced to a MinHash signature. LSH banding finds candidate
+    entries in O(bands); the best candidate is returned when its estimated
+    Jaccard similarity reaches ``threshold`` and it mentions exactly the same
+    numbers (so "Article 370" never answers "Article 371").
+    """
+
+    _PRIME = (1 << 31) - 1
+
+    # Lower thresholds raise the hit rate but start to confuse queries that
+    # differ in one key word ("rights" vs "duties" scores about 0.77)
+    def __init__(self, threshold=0.85, ngram=3, num_perm=64, bands=16,
+                 max_entries=2000, ttl=7 * 24 * 3600, seed=1):
+        assert num_perm % bands == 0
+        self.threshold = threshold
+        self.ngram = ngram
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.counters = {'exact_hits': 0, 'near_hits': 0, 'misses': 0, 'writes': 0}
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, self._PRIME, size=num_perm, dtype=np.uint64)[:, None]
+
+        self._entries = OrderedDict()  # normalized text -> (signature, numbers, answer, created_at)
+        self._buckets = {}             # (band, band hash) -> set of normalized texts
+        self._lock = threading.Lock()
+
+    def _signature(self, text):
+        padded = f" {text} "
+        shingles = {padded[i:i + self.ngram] for i in range(max(1, len(padded) - self.ngram + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % self._PRIME).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _remove(self, text):
+        signature = self._entries.pop(text)[0]
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(text)
+                if not bucket:
+                    del self._buckets[key]
+
+    def get(self, query):
+        """Cached answer for ``query`` or a near-duplicate of it, else None."""
+        text = normalize_query(query)
+        if not text:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(text)
+            if entry is not None and now - entry[3] <= self.ttl:
+                self._entries.move_to_end(text)
+                self.counters['exact_hits'] += 1
+                return entry[2]
+
+            signature = self._signature(text)
+            numbers = _NUMBER.findall(text)
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            live = []
+            for candidate in candidates:
+                _, cand_numbers, _, created_at = self._entries[candidate]
+                if now - created_at > self.ttl:
+                    self._remove(candidate)
+                elif cand_numbers == numbers:
+                    live.append(candidate)
+
+            best, best_score = None, 0.0
+            if live:
+                signatures = np.stack([self._entries[c][0] for c in live])
+                scores = (signatures == signature).mean(axis=1)
+                best_index = int(scores.argmax())
+                best, best_score = live[best_index], float(scores[best_index])
+
+            if best is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best)
+                self.counters['near_hits'] += 1
+                return self._entries[best][2]
+            self.counters['misses'] += 1
+            return None
+
+    def put(self, query, answer):
+        text = normalize_query(query)
+        if not text:
+            return
+        signature = self._signature(text)
+        with self._lock:
+            if text in self._entries:
+                self._remove(text)
+            self._entries[text] = (signature, _NUMBER.findall(text), answer, time.time())
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(text)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self.counters['writes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['exact_hits'] + stats['near_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['exact_hits'] + stats['near_hits']) / lookups if lookups else 0.0
+        return stats
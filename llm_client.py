@@ -0,0 +1,586 @@
+"""Shared client layer for every LLM call the app makes.
+
+``LLMClient`` runs calls on a bounded worker pool, enforces a per-call
+deadline and retries retryable failures with jittered exponential backoff.
+The transport is pluggable: Gemini in production, a plain HTTP endpoint (for
+a local stand-in server) or a deterministic stub for tests and dry runs.
+``LLMClient.stream`` yields text chunks as they arrive and stops the upstream
+call as soon as the consumer goes away.
+
+With a ``rate_limit.Scheduler`` every upstream call first waits for its
+turn by priority (interactive, study, background) within the process's
+requests-per-minute, tokens-per-minute and worker limits.
+
+Identical concurrent calls are coalesced ("single flight"): callers asking
+for the same prompt and options while a call is running wait for that call
+instead of starting another. A shared stream is replayed from its first
+chunk to late joiners and only cancelled when its last consumer leaves.
+
+Every transport accepts ``json_schema``: the reply is then constrained to
+JSON matching that schema (Gemini structured output; forwarded as-is to an
+HTTP endpoint; ignored by the stub).
+"""
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import urlsplit
+
+import telemetry
+from rate_limit import (INTERACTIVE, AdmissionTimeout, QueueFull, RateLimiter,
+                        Scheduler, estimate_tokens)
+
+GEMINI_MODEL = 'gemini-2.0-flash-exp'
+# Reply size reserved against the tokens-per-minute budget until the real size is known
+EXPECTED_REPLY_TOKENS = 1000
+# HTTP status codes worth retrying
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The model call failed after all retries."""
+
+
+class LLMTimeout(LLMError):
+    """The model call did not finish before its deadline."""
+
+
+class LLMBusy(LLMError):
+    """Too many calls are queued for the rate limits; the call was not started."""
+
+
+class TransportError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.code = status
+
+
+def is_retryable(exc):
+    """Transient network errors, timeouts, rate limits and 5xx responses."""
+    if isinstance(exc, (ConnectionError, TimeoutError, http.client.HTTPException)):
+        return True
+    # google.api_core exceptions carry the HTTP status as ``code``
+    return getattr(exc, 'code', None) in RETRYABLE_STATUS
+
+
+# ----- Transports -----
+class GeminiTransport:
+    """google.generativeai; the model object (and its channel) is reused."""
+
+    def __init__(self, api_key=None, model_name=GEMINI_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    @staticmethod
+    def _options(json_schema, options):
+        if json_schema is not None:
+            config = dict(options.pop('generation_config', None) or {})
+            config.update(response_mime_type='application/json', response_schema=json_schema)
+            options['generation_config'] = config
+        return options
+
+    def generate(self, prompt, timeout=None, json_schema=None, **options):
+        request_options = {'timeout': timeout} if timeout else None
+        response = self.model.generate_content(prompt, request_options=request_options,
+                                               **self._options(json_schema, options))
+        return response.text
+
+    def stream(self, prompt, timeout=None, json_schema=None, **options):
+        request_options = {'timeout': timeout} if timeout else None
+        response = self.model.generate_content(prompt, stream=True,
+                                               request_options=request_options,
+                                               **self._options(json_schema, options))
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class HTTPTransport:
+    """POSTs ``{"prompt": ...}`` as JSON and reads ``{"text": ...}`` back.
+
+    With ``"stream": true`` the server answers with one ``{"text": ...}`` JSON
+    object per line. Each worker thread keeps its own keep-alive connection.
+    """
+
+    def __init__(self, endpoint):
+        parts = urlsplit(endpoint)
+        self.https = parts.scheme == 'https'
+        self.host = parts.netloc
+        self.path = parts.path or '/'
+        self._local = threading.local()
+
+    def _connection(self, timeout):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = conn_class(self.host, timeout=timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _request(self, body, timeout):
+        conn = self._connection(timeout)
+        try:
+            conn.request('POST', self.path, body=body,
+                          headers={'Content-Type': 'application/json'})
+            return conn.getresponse()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def generate(self, prompt, timeout=None, **options):
+        body = json.dumps({'prompt': prompt, **options}).encode('utf-8')
+        response = self._request(body, timeout)
+        payload = response.read()
+        if response.status != 200:
+            raise TransportError(f"HTTP {response.status}: {payload[:200]!r}", response.status)
+        return json.loads(payload)['text']
+
+    def stream(self, prompt, timeout=None, **options):
+        body = json.dumps({'prompt': prompt, 'stream': True, **options}).encode('utf-8')
+        response = self._request(body, timeout)
+        if response.status != 200:
+            payload = response.read()
+            raise TransportError(f"HTTP {response.status}: {payload[:200]!r}", response.status)
+        finished = False
+        try:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)['text']
+            finished = True
+        finally:
+            if not finished:
+                # A half-read response cannot be reused; drop the connection
+                self._local.conn.close()
+                self._local.conn = None
+
+
+class StubTransport:
+    """Deterministic local stand-in for the model.
+
+    With ``json_schema`` it answers with placeholder JSON shaped by the
+    schema (arrays get ``min_items`` entries), so structured callers such as
+    quiz generation work offline too.
+    """
+
+    def __init__(self, delay=0.0, reply=None):
+        self.delay = delay
+        self.reply = reply
+
+    def generate(self, prompt, timeout=None, json_schema=None, **options):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.reply is not None:
+            return self.reply(prompt) if callable(self.reply) else self.reply
+        if json_schema is not None:
+            seed = f"{zlib.crc32(prompt.encode('utf-8')):08x}"
+            return json.dumps(_stub_value(json_schema, seed), ensure_ascii=False, indent=1)
+        return f"[stub] {prompt.strip().splitlines()[0]} ({len(prompt)} chars)"
+
+    def stream(self, prompt, timeout=None, **options):
+        text = self.generate(prompt, timeout, **options)
+        for word in text.split(' '):
+            yield word + ' '
+
+
+def _stub_value(schema, path):
+    kind = schema.get('type')
+    if kind == 'array':
+        return [_stub_value(schema.get('items', {}), f"{path}.{i + 1}")
+                for i in range(schema.get('min_items', 1))]
+    if kind == 'object':
+        value = {name: _stub_value(field, f"{path}.{name}")
+                 for name, field in schema.get('properties', {}).items()}
+        # Quiz items: the answer has to be one of the options
+        if value.get('options') and 'answer' in value:
+            value['answer'] = value['options'][0]
+        return value
+    if kind in ('integer', 'number'):
+        return 0
+    if kind == 'boolean':
+        return False
+    return f"stub {path}"
+
+
+# ----- Single Flight -----
+def flight_key(prompt, options):
+    """Identity of a call: the prompt plus every option that shapes the reply."""
+    return json.dumps([prompt, options], sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def _shared_error(error):
+    # Each waiter raises its own exception object; tracebacks are per thread
+    if isinstance(error, LLMError):
+        return type(error)(str(error))
+    return LLMError(f"Shared call failed: {error!r}")
+
+
+class _SharedStream:
+    """One upstream stream and the chunks it has produced so far.
+
+    There is no pump thread: whichever consumer runs out of buffered chunks
+    first pulls the next one from upstream while the others wait.
+    """
+
+    def __init__(self, upstream, lock):
+        self.upstream = upstream
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self.fetching = False
+        self.consumers = 0
+        self.changed = threading.Condition(lock)
+
+
+# ----- Client -----
+class LLMClient:
+    """Deadline-aware, retrying front for a transport, on a bounded pool."""
+
+    def __init__(self, transport, max_workers=8, timeout=60.0, retries=3,
+                 backoff_base=0.5, backoff_max=8.0, coalesce=True, scheduler=None):
+        self.transport = transport
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.coalesce = coalesce
+        self.scheduler = scheduler
+        self.counters = {'calls': 0, 'retries': 0, 'errors': 0, 'timeouts': 0, 'coalesced': 0,
+                         'busy': 0}
+        self._counter_lock = threading.Lock()
+        # In-flight calls by flight_key: Futures for generate, _SharedStreams for stream
+        self._flights = {}
+        self._streams = {}
+        self._flight_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Gemini by default; TNPSC_LLM_ENDPOINT or TNPSC_LLM_STUB=1 override it.
+
+        Calls are scheduled by priority within TNPSC_LLM_RPM requests and
+        TNPSC_LLM_TPM tokens per minute (0 = unlimited).
+        """
+        endpoint = os.getenv("TNPSC_LLM_ENDPOINT")
+        if endpoint:
+            transport = HTTPTransport(endpoint)
+        elif os.getenv("TNPSC_LLM_STUB", "0").lower() in ("1", "true", "yes"):
+            transport = StubTransport()
+        else:
+            transport = GeminiTransport(os.getenv("GEMINI_API_KEY"))
+        settings = {
+            'max_workers': int(os.getenv("TNPSC_LLM_WORKERS", "8")),
+            'timeout': float(os.getenv("TNPSC_LLM_TIMEOUT", "60")),
+        }
+        settings.update(overrides)
+        if 'scheduler' not in settings:
+            limiter = RateLimiter(rpm=float(os.getenv("TNPSC_LLM_RPM", "0")),
+                                  tpm=float(os.getenv("TNPSC_LLM_TPM", "0")))
+            settings['scheduler'] = Scheduler(limiter, max_concurrent=settings['max_workers'],
+                                              max_queue=int(os.getenv("TNPSC_LLM_QUEUE", "200")))
+        return cls(transport, **settings)
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._counter_lock:
+            return dict(self.counters)
+
+    def _admit(self, prompt, priority, deadline, key, on_wait=None):
+        """Wait for the scheduler to let this call start; returns its ticket (or None)."""
+        if self.scheduler is None:
+            return None
+        try:
+            return self.scheduler.acquire(priority, estimate_tokens(prompt) + EXPECTED_REPLY_TOKENS,
+                                          timeout=max(deadline - time.monotonic(), 0), key=key,
+                                          on_wait=on_wait)
+        except QueueFull as e:
+            self._count('busy')
+            raise LLMBusy(str(e)) from e
+        except AdmissionTimeout as e:
+            self._count('timeouts')
+            raise LLMTimeout(f"Waited in the queue until the deadline: {str(e)}") from e
+
+    def _release(self, ticket, prompt, reply_bytes):
+        if ticket is not None:
+            self.scheduler.release(ticket, estimate_tokens(prompt) + reply_bytes // 4)
+
+    def _backoff(self, attempt):
+        # "Equal jitter": half fixed, half random
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _record(kind, outcome, start, prompt, response_chars, first_chunk=None):
+        labels = {'kind': kind, 'outcome': outcome}
+        telemetry.observe("llm_call_seconds", time.perf_counter() - start, **labels)
+        telemetry.observe("llm_prompt_chars", len(prompt), telemetry.SIZE_BUCKETS, kind=kind)
+        if outcome == 'ok':
+            telemetry.observe("llm_response_chars", response_chars, telemetry.SIZE_BUCKETS, kind=kind)
+        if first_chunk is not None:
+            telemetry.observe("llm_first_chunk_seconds", first_chunk - start, kind=kind)
+
+    def generate(self, prompt, timeout=None, priority=INTERACTIVE, on_wait=None, **options):
+        """Return the model's text for ``prompt`` or raise LLMError/LLMTimeout.
+
+        ``timeout`` bounds the whole call, including queueing, retries and
+        backoff. If the same call is already running, wait (up to ``timeout``)
+        for its result or error instead of starting another. LLMBusy means the
+        scheduler's queue was full; ``on_wait(position, eta_seconds)`` reports
+        progress while the call is queued.
+        """
+        key = flight_key(prompt, options)
+        if not self.coalesce:
+            return self._timed_generate(prompt, timeout, priority, key, on_wait, **options)
+        with self._flight_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            if self.scheduler is not None:
+                self.scheduler.promote(key, priority)
+            try:
+                return flight.result(timeout=timeout or self.timeout)
+            except FutureTimeout:
+                self._count('timeouts')
+                raise LLMTimeout(f"No response within {timeout or self.timeout:g}s") from None
+            except Exception as e:
+                raise _shared_error(e) from e
+
+        try:
+            text = self._timed_generate(prompt, timeout, priority, key, on_wait, **options)
+        except BaseException as e:
+            flight.set_exception(e if isinstance(e, Exception) else LLMError("Cancelled"))
+            raise
+        else:
+            flight.set_result(text)
+            return text
+        finally:
+            with self._flight_lock:
+                del self._flights[key]
+
+    def _timed_generate(self, prompt, timeout, priority, key, on_wait, **options):
+        if not telemetry.ENABLED:
+            return self._generate(prompt, timeout, priority, key, on_wait, **options)
+        start = time.perf_counter()
+        outcome, text = 'error', ''
+        try:
+            text = self._generate(prompt, timeout, priority, key, on_wait, **options)
+            outcome = 'ok'
+            return text
+        except LLMTimeout:
+            outcome = 'timeout'
+            raise
+        finally:
+            self._record('generate', outcome, start, prompt, len(text))
+
+    def _generate(self, prompt, timeout, priority, key, on_wait=None, **options):
+        self._count('calls')
+        deadline = time.monotonic() + (timeout or self.timeout)
+        ticket = self._admit(prompt, priority, deadline, key, on_wait)
+        attempt = 0
+        text = ''
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._count('timeouts')
+                    raise LLMTimeout(f"No response within {timeout or self.timeout:g}s")
+                future = self._pool.submit(self.transport.generate, prompt, timeout=remaining, **options)
+                try:
+                    text = future.result(timeout=remaining)
+                    return text
+                except FutureTimeout:
+                    future.cancel()
+                    self._count('timeouts')
+                    raise LLMTimeout(f"No response within {timeout or self.timeout:g}s") from None
+                except Exception as e:
+                    if attempt >= self.retries or not is_retryable(e):
+                        self._count('errors')
+                        raise LLMError(str(e)) from e
+                    delay = self._backoff(attempt)
+                    if time.monotonic() + delay >= deadline:
+                        self._count('timeouts')
+                        raise LLMTimeout(f"Gave up retrying before the deadline: {str(e)}") from e
+                    time.sleep(delay)
+                    self._count('retries')
+                    if ticket is not None:
+                        self.scheduler.charge(ticket)
+                    attempt += 1
+        finally:
+            self._release(ticket, prompt, len(text.encode('utf-8')))
+
+    def stream(self, prompt, timeout=None, priority=INTERACTIVE, **options):
+        """Yield text chunks for ``prompt`` as the model produces them.
+
+        Consumers of the same call share one upstream stream: a consumer that
+        joins late first gets the chunks produced so far. The upstream is
+        cancelled when the last consumer closes; errors reach every consumer.
+        """
+        key = flight_key(prompt, options)
+        if not self.coalesce:
+            yield from self._stream(prompt, timeout, priority, key, **options)
+            return
+        limit = timeout or self.timeout
+        deadline = time.monotonic() + limit
+        with self._flight_lock:
+            shared = self._streams.get(key)
+            joined = shared is not None
+            if not joined:
+                shared = self._streams[key] = _SharedStream(
+                    self._stream(prompt, timeout, priority, key, **options), self._flight_lock)
+            shared.consumers += 1
+        if joined:
+            self._count('coalesced')
+            if self.scheduler is not None:
+                self.scheduler.promote(key, priority)
+
+        index = 0
+        try:
+            while True:
+                with shared.changed:
+                    while index == len(shared.chunks) and not shared.done and shared.fetching:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._count('timeouts')
+                            raise LLMTimeout(f"No response within {limit:g}s")
+                        shared.changed.wait(remaining)
+                    if index < len(shared.chunks):
+                        chunk = shared.chunks[index]
+                    elif shared.done:
+                        if shared.error is not None:
+                            raise _shared_error(shared.error) from shared.error
+                        return
+                    else:
+                        shared.fetching = True
+                        chunk = None
+                if chunk is None:
+                    self._fetch(key, shared)
+                    continue
+                index += 1
+                yield chunk
+        finally:
+            with self._flight_lock:
+                shared.consumers -= 1
+                abandoned = shared.consumers == 0 and not shared.done
+                if abandoned:
+                    shared.done = True
+                    shared.error = LLMError("Cancelled")
+                    if self._streams.get(key) is shared:
+                        del self._streams[key]
+            if abandoned:
+                # Nobody is inside next() now, so the upstream can be closed here
+                shared.upstream.close()
+
+    def _fetch(self, key, shared):
+        """Pull the next upstream chunk into ``shared`` for every consumer."""
+        try:
+            chunk, error = next(shared.upstream), None
+        except StopIteration:
+            chunk, error = None, None
+        except BaseException as e:
+            chunk, error = None, e
+        with shared.changed:
+            shared.fetching = False
+            if chunk is not None:
+                shared.chunks.append(chunk)
+            else:
+                shared.done = True
+                shared.error = error
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+            shared.changed.notify_all()
+        if error is not None and not isinstance(error, Exception):
+            raise error
+
+    def _stream(self, prompt, timeout, priority, key, **options):
+        """One upstream stream: scheduling, pooled transport call, retries and deadline.
+
+        The transport runs on the worker pool and hands chunks over through a
+        queue. Failures before the first chunk are retried like ``generate``;
+        once output has started an error is raised to the consumer. Closing
+        the generator (or abandoning it) cancels the upstream stream.
+        """
+        limit = timeout or self.timeout
+        deadline = time.monotonic() + limit
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    upstream = self.transport.stream(
+                        prompt, timeout=max(deadline - time.monotonic(), 0.1), **options)
+                    try:
+                        for text in upstream:
+                            if cancelled.is_set():
+                                return
+                            started = True
+                            chunks.put(('chunk', text))
+                    finally:
+                        close = getattr(upstream, 'close', None)
+                        if close:
+                            close()
+                    chunks.put(('done', None))
+                    return
+                except Exception as e:
+                    delay = self._backoff(attempt)
+                    if (started or cancelled.is_set() or attempt >= self.retries
+                            or not is_retryable(e) or time.monotonic() + delay >= deadline):
+                        chunks.put(('error', e))
+                        return
+                    time.sleep(delay)
+                    self._count('retries')
+                    if ticket is not None:
+                        self.scheduler.charge(ticket)
+                    attempt += 1
+
+        self._count('calls')
+        ticket = self._admit(prompt, priority, deadline, key)
+        self._pool.submit(produce)
+        start = time.perf_counter()
+        first_chunk = None
+        # Abandoned by the consumer unless one of the outcomes below is reached
+        outcome, response_chars, response_bytes = 'cancelled', 0, 0
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    kind, value = chunks.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    self._count('timeouts')
+                    outcome = 'timeout'
+                    raise LLMTimeout(f"No response within {limit:g}s") from None
+                if kind == 'chunk':
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    response_chars += len(value)
+                    response_bytes += len(value.encode('utf-8'))
+                    yield value
+                elif kind == 'done':
+                    outcome = 'ok'
+                    return
+                else:
+                    self._count('errors')
+                    outcome = 'error'
+                    raise LLMError(str(value)) from value
+        finally:
+            cancelled.set()
+            self._release(ticket, prompt, response_bytes)
+            if telemetry.ENABLED:
+                self._record('stream', outcome, start, prompt, response_chars, first_chunk)
@@ -0,0 +1,123 @@
+"""Background prefetching on a small shared thread pool.
+
+A ``Prefetcher`` runs ``fetch(item)`` for batches of items, e.g. the AI
+explanations of the ten questions of a quiz while the quiz is still being
+answered. ``fetch`` stores its own results (the app writes into the shared
+explanation cache), so the prefetcher only tracks work: which items of a
+batch are queued, running or done.
+
+Batches belong to one quiz attempt. Cancelling a batch drops its queued
+items; items already running finish and still fill the cache. A batch that
+nobody has touched for ``idle_timeout`` seconds (the session went away) is
+cancelled the next time any batch is submitted. The total number of queued
+items is bounded; items over the bound are skipped, not queued.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class _Batch:
+    __slots__ = ('futures', 'touched')
+
+    def __init__(self):
+        self.futures = {}  # item -> Future
+        self.touched = time.monotonic()
+
+
+class Prefetcher:
+    """Runs ``fetch(item)`` for batches of items on ``max_workers`` threads."""
+
+    def __init__(self, fetch, max_workers=2, max_pending=100, idle_timeout=900):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.counters = {'submitted': 0, 'done': 0, 'failed': 0, 'cancelled': 0, 'skipped': 0}
+        self._batches = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+                      if max_workers > 0 else None)
+
+    def _run(self, item):
+        try:
+            self.fetch(item)
+        except Exception:
+            # The foreground path fetches (and reports) the item again if needed
+            with self._lock:
+                self.counters['failed'] += 1
+            raise
+        with self._lock:
+            self.counters['done'] += 1
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def prefetch(self, batch_id, items):
+        """Queue every item of ``items`` not already queued in ``batch_id``.
+
+        Safe to call on every rerun: known items are not queued twice, and
+        items of a cancelled batch are queued again.
+        """
+        if self._pool is None:
+            return
+        self._cancel_idle()
+        submitted = []
+        with self._lock:
+            batch = self._batches.setdefault(batch_id, _Batch())
+            batch.touched = time.monotonic()
+            for item in items:
+                future = batch.futures.get(item)
+                if future is not None and not future.cancelled():
+                    continue
+                if self._pending >= self.max_pending:
+                    self.counters['skipped'] += 1
+                    continue
+                batch.futures[item] = future = self._pool.submit(self._run, item)
+                self._pending += 1
+                self.counters['submitted'] += 1
+                submitted.append(future)
+        # Outside the lock: a future that is already done runs its callback at once
+        for future in submitted:
+            future.add_done_callback(self._finished)
+
+    def cancel(self, batch_id):
+        """Drop the batch; returns how many queued items were cancelled."""
+        with self._lock:
+            batch = self._batches.pop(batch_id, None)
+        if batch is None:
+            return 0
+        cancelled = sum(1 for future in batch.futures.values() if future.cancel())
+        with self._lock:
+            self.counters['cancelled'] += cancelled
+        return cancelled
+
+    def _cancel_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [batch_id for batch_id, batch in self._batches.items() if batch.touched < cutoff]
+        for batch_id in idle:
+            self.cancel(batch_id)
+
+    def pending(self, batch_id):
+        """Items of the batch that are still queued or running."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return 0
+            batch.touched = time.monotonic()
+            return sum(1 for future in batch.futures.values() if not future.done())
+
+    def wait(self, batch_id, timeout=None):
+        """Block until every item of the batch has finished or ``timeout`` passes."""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            futures = list(batch.futures.values()) if batch is not None else []
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, pending=self._pending, batches=len(self._batches))
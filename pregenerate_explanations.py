@@ -0,0 +1,170 @@
+"""Pre-generate AI explanations for the whole question bank.
+
+Runs the same prompt as ``generate_explanation`` in Tamil.py for every row in
+both languages through the shared ``LLMClient`` (deadlines and retries), with
+bounded concurrency and a requests-per-minute limit enforced by the client's
+``rate_limit.Scheduler``.
+Finished items are appended to a JSONL checkpoint, so an interrupted run
+resumes where it stopped; the results are then written to a Parquet sidecar
+keyed by row id that the quiz results page reads before calling the API.
+
+    python pregenerate_explanations.py --workers 4 --rpm 60
+    python pregenerate_explanations.py --stub --limit 100   # no API calls
+
+Stub runs write to a scratch directory (``STUB_OUTPUT_DIR``) unless
+``--output`` is given, so their text never reaches the app's sidecar or the
+checkpoint of a real run.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from llm_client import LLMClient, StubTransport
+from prompts import explanation_prompt
+from question_store import (SNAPSHOT_DIR, correct_option, ensure_snapshot,
+                            explanation_sidecar_path)
+from rate_limit import BACKGROUND, RateLimiter, Scheduler
+
+LANGUAGES = ("English", "Tamil")
+STUB_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "tnpsc-stub-explanations")
+
+
+# ----- Dataset -----
+def iter_batches(path):
+    """Record batches of question/options/answer from a Parquet or Arrow file."""
+    columns = ['question', 'options', 'answer']
+    if path.endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(columns=columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).select(columns)
+
+
+def iter_items(path, languages, limit=None):
+    """Yield ``(row_id, language, prompt)`` for every row and language."""
+    row_id = 0
+    for batch in iter_batches(path):
+        for row in batch.to_pylist():
+            if limit is not None and row_id >= limit:
+                return
+            try:
+                answer = correct_option(row['options'], row['answer'])
+            except (TypeError, ValueError, IndexError):
+                row_id += 1
+                continue
+            for language in languages:
+                yield row_id, language, explanation_prompt(row['question'], answer, language)
+            row_id += 1
+
+
+# ----- Checkpointing -----
+def load_checkpoint(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line
+                done[(record['row_id'], record['language'])] = record['explanation']
+    return done
+
+
+def write_sidecar(done, output):
+    keys = sorted(done)
+    table = pa.table({
+        'row_id': pa.array([k[0] for k in keys], type=pa.int64()),
+        'language': pa.array([k[1] for k in keys], type=pa.string()),
+        'explanation': pa.array([done[k] for k in keys], type=pa.string()),
+    })
+    tmp_path = output + ".tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, output)
+    return table.num_rows
+
+
+# ----- Runner -----
+def run(source, output, checkpoint, client, languages=LANGUAGES, workers=4,
+        limit=None, log=print):
+    done = load_checkpoint(checkpoint)
+    pending = [item for item in iter_items(source, languages, limit)
+               if (item[0], item[1]) not in done]
+    log(f"{len(done)} explanations already done, {len(pending)} to generate")
+
+    lock = threading.Lock()
+    failures = 0
+    with open(checkpoint, 'a', encoding='utf-8') as ckpt, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(client.generate, prompt, priority=BACKGROUND): (row_id, language)
+                   for row_id, language, prompt in pending}
+        for count, future in enumerate(as_completed(futures), 1):
+            row_id, language = futures[future]
+            try:
+                text = future.result()
+            except Exception as e:
+                failures += 1
+                log(f"row {row_id} ({language}) failed: {str(e)}")
+                continue
+            with lock:
+                done[(row_id, language)] = text
+                ckpt.write(json.dumps({'row_id': row_id, 'language': language,
+                                       'explanation': text}, ensure_ascii=False) + "\n")
+                ckpt.flush()
+            if count % 100 == 0:
+                log(f"{count}/{len(pending)} generated")
+
+    rows = write_sidecar(done, output)
+    log(f"Wrote {rows} explanations to {output} ({failures} failed; rerun to retry)")
+    return rows, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source", help="Parquet or Arrow question file (default: local snapshot)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--output", help="Parquet sidecar path (default: next to the snapshot; "
+                                         "with --stub, under STUB_OUTPUT_DIR)")
+    parser.add_argument("--checkpoint", help="JSONL progress file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=LANGUAGES)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=60, help="Requests per minute (0 = unlimited)")
+    parser.add_argument("--limit", type=int, help="Only the first N rows")
+    parser.add_argument("--stub", action="store_true", help="Use the local stub model")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        source = args.source
+        output = os.path.splitext(source)[0] + "-explanations.parquet"
+    else:
+        source = ensure_snapshot(args.snapshot_dir)
+        output = explanation_sidecar_path(source)
+    if args.output:
+        output = args.output
+    elif args.stub:
+        # Never next to the snapshot: the app would serve stub text to real users
+        os.makedirs(STUB_OUTPUT_DIR, exist_ok=True)
+        output = os.path.join(STUB_OUTPUT_DIR, os.path.basename(output))
+    checkpoint = args.checkpoint or output + ".checkpoint.jsonl"
+    # One limiter on the call path: the client's scheduler, also for stub runs
+    scheduler = Scheduler(RateLimiter(rpm=args.rpm), max_concurrent=args.workers)
+    if args.stub:
+        client = LLMClient(StubTransport(), max_workers=args.workers, scheduler=scheduler)
+    else:
+        client = LLMClient.from_env(max_workers=args.workers, timeout=120, scheduler=scheduler)
+
+    _, failures = run(source, output, checkpoint, client, args.languages,
+                      args.workers, args.limit)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Prompt templates for every Gemini call made by the app.
+
+Kept free of Streamlit imports so batch tools can build the same prompts.
+"""
+
+# Response schema for quiz_questions_prompt, in the OpenAPI subset Gemini's
+# structured output accepts
+QUIZ_QUESTIONS_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'question': {'type': 'string'},
+            'options': {'type': 'array', 'items': {'type': 'string'},
+                        'min_items': 4, 'max_items': 4},
+            'answer': {'type': 'string'},
+            'explanation': {'type': 'string'},
+        },
+        'required': ['question', 'options', 'answer', 'explanation'],
+    },
+}
+
+
+def quiz_questions_schema(count):
+    """``QUIZ_QUESTIONS_SCHEMA`` pinned to exactly ``count`` questions"""
+    return dict(QUIZ_QUESTIONS_SCHEMA, min_items=count, max_items=count)
+
+
+def explanation_prompt(question, correct_answer, language):
+    """Prompt for explaining a bank question and its correct answer"""
+    return f"""
+    You are an expert Tamil Nadu Public Service Commission (TNPSC) exam tutor.
+    Explain the following question and its correct answer to a student in a clear, concise manner.
+    
+    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
+    If the language is Tamil, use proper Tamil script and avoid English words.
+    If the language is English, use clear English without Tamil words.
+    
+    Question: {question}
+    Correct Answer: {correct_answer}
+    
+    Provide a detailed explanation in {language} that includes:
+    - Why this answer is correct
+    - Additional context or background information
+    - Related concepts that might help in understanding
+    
+    Response in {language}:
+    """
+
+
+def study_material_prompt(topic, language):
+    """Prompt for study material on one or more topics"""
+    return f"""
+    You are an expert Tamil Nadu Public Service Commission (TNPSC) exam tutor.
+    Create comprehensive study material on the topic: {topic}
+    
+    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
+    If the language is Tamil, use proper Tamil script exclusively.
+    If the language is English, use clear English exclusively.
+    
+    Include the following sections in {language}:
+    - முக்கிய கருத்துகள் மற்றும் வரையறைகள் (Key concepts and definitions)
+    - வரலாற்று பின்னணி (Historical context - if applicable)
+    - முக்கிய உண்மைகள் மற்றும் புள்ளிவிவரங்கள் (Important facts and figures)
+    - TNPSC தேர்வுகளுக்கான தொடர்பு (Relevance to TNPSC exams)
+    - மாதிரி கேள்விகள் (Sample questions - if applicable)
+    
+    Structure the content with clear headings. Use simple language suitable for exam preparation.
+    
+    Study material in {language}:
+    """
+
+
+def quiz_questions_prompt(topic, count, language, batch=None, exclude=None):
+    """Prompt for a JSON array of multiple-choice questions
+
+    ``batch`` is ``(index, total)`` when several prompts run in parallel for
+    one quiz; ``exclude`` lists questions the quiz already has.
+    """
+    variety = f"""
+    This is batch {batch[0]} of {batch[1]} generated in parallel for the same quiz:
+    cover different sub-topics and facts than the other batches would.
+    """ if batch and batch[1] > 1 else ""
+    avoid = "".join(f"\n    - {question}" for question in exclude or ())
+    avoid = f"""
+    Do NOT repeat or rephrase any of these existing questions:{avoid}
+    """ if avoid else ""
+    return f"""
+    Generate {count} multiple-choice questions for TNPSC exam preparation on the topic: {topic}
+    {variety}{avoid}
+    IMPORTANT: All content must be ONLY in {language}. Do not mix languages.
+    If generating in Tamil, use proper Tamil script exclusively.
+    If generating in English, use clear English exclusively.
+    
+    Format each question as a JSON object with the following keys:
+    - "question": the question text in {language}
+    - "options": array of exactly 4 options in {language}
+    - "answer": the correct answer (must be one of the 4 options, exact match)
+    - "explanation": a brief explanation in {language} of why this is the correct answer
+    
+    Example format:
+    [
+        {{
+            "question": "Question text in {language}",
+            "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
+            "answer": "Option 2",
+            "explanation": "Explanation in {language}"
+        }}
+    ]
+    
+    Return ONLY a valid JSON array. No other text before or after.
+    """
+
+
+def chat_prompt(query, language, context=None):
+    """Prompt for a tutor chat reply, optionally grounded in bank questions"""
+    grounding = f"""
+    Related questions from the official TNPSC question bank (use them where relevant,
+    and keep your answer consistent with their correct answers):
+    {context}
+    """ if context else ""
+    return f"""
+    You are an expert tutor for Tamil Nadu Public Service Commission (TNPSC) exams.
+    
+    IMPORTANT: Respond ONLY in {language}. Do not mix languages.
+    If the user asked in Tamil, respond completely in Tamil using proper Tamil script.
+    If the user asked in English, respond completely in English.
+    
+    Answer the following question in a helpful, educational manner. 
+    If the question is not related to TNPSC exams, politely decline to answer and redirect to TNPSC topics.
+    {grounding}
+    User Question: {query}
+    
+    Response in {language}:
+    """
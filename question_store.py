@@ -0,0 +1,371 @@
+"""Local snapshot store and Arrow-backed view of the TNPSC question bank.
+
+The Parquet file on the Hugging Face hub is downloaded once, identified by
+its SHA-256 content hash and converted into an uncompressed Arrow IPC
+(Feather v2) file that later loads memory-map instead of re-downloading.
+``QuestionStore`` serves rows straight from that mapping.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from huggingface_hub import hf_hub_download
+
+from language import language_columns
+
+# ----- Configuration -----
+DATASET_REPO_ID = 'snegha24/Tamil_tnpscExam'
+DATASET_FILENAME = 'train-00000-of-00001.parquet'
+DATASET_SUBFOLDER = 'data'
+
+SNAPSHOT_DIR = os.getenv(
+    "TNPSC_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+)
+# Never contact the hub; serve whatever snapshot is already on disk
+OFFLINE = os.getenv("TNPSC_OFFLINE", "0").lower() in ("1", "true", "yes")
+# Re-check the hub once a snapshot is older than this (0 = never)
+SNAPSHOT_MAX_AGE = int(os.getenv("TNPSC_SNAPSHOT_MAX_AGE", "0"))
+
+MANIFEST_NAME = "manifest.json"
+ROW_GROUP_SIZE = 4096
+
+# Columns the quiz path reads on every question; everything else is lazy
+QUIZ_COLUMNS = ('question', 'options', 'answer')
+
+
+class SnapshotUnavailable(Exception):
+    """Raised when no usable snapshot exists and the hub cannot provide one."""
+
+
+# ----- Manifest Helpers -----
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_bytes(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """Return the manifest of the current snapshot, or None if there is none."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _current_snapshot(snapshot_dir):
+    """Path of the snapshot named by the manifest, if it is present and intact."""
+    manifest = read_manifest(snapshot_dir)
+    if not manifest:
+        return None, None
+    path = os.path.join(snapshot_dir, manifest.get('arrow_file', ''))
+    try:
+        if os.path.getsize(path) != manifest.get('arrow_bytes'):
+            return None, None
+    except OSError:
+        return None, None
+    return path, manifest
+
+
+# ----- Snapshot Creation -----
+def _convert_to_arrow(parquet_path, arrow_path):
+    """Rewrite the Parquet file as an uncompressed, memory-mappable IPC file."""
+    table = pq.read_table(parquet_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(arrow_path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=ROW_GROUP_SIZE)
+        os.replace(tmp_path, arrow_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return table.num_rows
+
+
+def _prune_snapshots(snapshot_dir, keep):
+    for name in os.listdir(snapshot_dir):
+        if name.startswith("questions-") and name.endswith(".arrow") and name != keep:
+            try:
+                os.remove(os.path.join(snapshot_dir, name))
+            except OSError:
+                pass
+
+
+def build_snapshot(parquet_path, snapshot_dir=SNAPSHOT_DIR, source=None):
+    """Install a Parquet file as the current snapshot and return its Arrow path.
+
+    The snapshot is versioned by the content hash of the Parquet file, so an
+    unchanged upstream file reuses the existing Arrow file untouched.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    content_hash = _sha256(parquet_path)
+    arrow_file = f"questions-{content_hash[:16]}.arrow"
+    arrow_path = os.path.join(snapshot_dir, arrow_file)
+
+    current = read_manifest(snapshot_dir)
+    if current and current.get('sha256') == content_hash and os.path.exists(arrow_path):
+        num_rows = current['num_rows']
+    else:
+        num_rows = _convert_to_arrow(parquet_path, arrow_path)
+
+    manifest = {
+        'sha256': content_hash,
+        'arrow_file': arrow_file,
+        'arrow_bytes': os.path.getsize(arrow_path),
+        'num_rows': num_rows,
+        'source': source or os.path.basename(parquet_path),
+        'created_at': time.time(),
+    }
+    _atomic_write_bytes(
+        os.path.join(snapshot_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode('utf-8')
+    )
+    _prune_snapshots(snapshot_dir, keep=arrow_file)
+    return arrow_path
+
+
+def download_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Fetch the dataset from the hub and install it as the current snapshot."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    parquet_path = hf_hub_download(
+        repo_id=DATASET_REPO_ID,
+        filename=DATASET_FILENAME,
+        cache_dir=os.path.join(snapshot_dir, "hub"),
+        repo_type='dataset',
+        subfolder=DATASET_SUBFOLDER
+    )
+    source = f"{DATASET_REPO_ID}/{DATASET_SUBFOLDER}/{DATASET_FILENAME}"
+    return build_snapshot(parquet_path, snapshot_dir, source=source)
+
+
+def ensure_snapshot(snapshot_dir=SNAPSHOT_DIR, offline=OFFLINE, refresh=False,
+                    max_age=SNAPSHOT_MAX_AGE):
+    """Return the path of a usable local snapshot, downloading only when needed.
+
+    In offline mode the hub is never contacted. Online, an existing snapshot is
+    served as-is unless ``refresh`` is set or it is older than ``max_age``; if
+    the hub fails during a refresh the existing snapshot is kept.
+    """
+    path, manifest = _current_snapshot(snapshot_dir)
+
+    if offline:
+        if path:
+            return path
+        raise SnapshotUnavailable(f"Offline mode: no question snapshot found in {snapshot_dir}")
+
+    expired = bool(manifest and max_age and time.time() - manifest.get('created_at', 0) > max_age)
+    if path and not (refresh or expired):
+        return path
+
+    try:
+        return download_snapshot(snapshot_dir)
+    except Exception as e:
+        if path:
+            return path
+        raise SnapshotUnavailable(f"Could not download question bank: {str(e)}") from e
+
+
+def snapshot_version(path):
+    """Content-hash prefix identifying the dataset version of a snapshot file."""
+    return os.path.basename(path)[len("questions-"):-len(".arrow")]
+
+
+def explanation_sidecar_path(snapshot_path):
+    """Where pre-generated explanations for a snapshot are stored."""
+    return os.path.join(os.path.dirname(snapshot_path),
+                        f"explanations-{snapshot_version(snapshot_path)}.parquet")
+
+
+def open_snapshot(path):
+    """Memory-map an Arrow snapshot and return it as a zero-copy table."""
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+# ----- Question Store -----
+class QuestionStore:
+    """Read-only question bank served from a memory-mapped Arrow snapshot.
+
+    Only ``QUIZ_COLUMNS`` are kept as a projected table; heavier text columns
+    such as ``explanation`` are read per record batch ("row group") the first
+    time a row in that batch is asked for, and a handful of recent batches are
+    kept. Since the file is memory-mapped, pages that are never read never
+    become resident.
+
+    ``is_tamil`` and ``tamil_ratio`` columns are derived from the question
+    text once, when the store is opened.
+    """
+
+    def __init__(self, path, lazy_batches=8):
+        self.path = path
+        self.version = snapshot_version(path)
+        self._reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        self.schema = self._reader.schema
+        self.num_batches = self._reader.num_record_batches
+
+        quiz_columns = [c for c in QUIZ_COLUMNS if c in self.schema.names]
+        batches = [self._reader.get_batch(i).select(quiz_columns)
+                   for i in range(self.num_batches)]
+        self._quiz = pa.Table.from_batches(batches, schema=pa.schema(
+            [self.schema.field(c) for c in quiz_columns]))
+        self._batch_starts = np.cumsum([0] + [b.num_rows for b in batches])
+
+        # Language of every question, computed once in a vectorized pass
+        self.is_tamil, self.tamil_ratio = language_columns(self._quiz.column('question'))
+        self._quiz = (self._quiz
+                      .append_column('is_tamil', pa.array(self.is_tamil))
+                      .append_column('tamil_ratio', pa.array(self.tamil_ratio)))
+        self._language_rows = {}
+
+        self._lazy = OrderedDict()
+        self._lazy_batches = lazy_batches
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._quiz.num_rows
+
+    @property
+    def columns(self):
+        return self.schema.names
+
+    def language_row_ids(self, is_tamil):
+        """Row ids of all Tamil (or all non-Tamil) questions."""
+        is_tamil = bool(is_tamil)
+        if is_tamil not in self._language_rows:
+            self._language_rows[is_tamil] = np.flatnonzero(self.is_tamil == is_tamil)
+        return self._language_rows[is_tamil]
+
+    def take(self, row_ids):
+        """Return the quiz columns of ``row_ids`` plus a ``row_id`` column."""
+        indices = pa.array(np.asarray(row_ids, dtype=np.int64))
+        return self._quiz.take(indices).append_column('row_id', indices)
+
+    def _locate(self, row_id):
+        batch = int(np.searchsorted(self._batch_starts, row_id, side='right')) - 1
+        return batch, row_id - int(self._batch_starts[batch])
+
+    def _lazy_column(self, name, batch):
+        key = (name, batch)
+        with self._lock:
+            column = self._lazy.get(key)
+            if column is not None:
+                self._lazy.move_to_end(key)
+                return column
+        column = self._reader.get_batch(batch).column(name)
+        with self._lock:
+            self._lazy[key] = column
+            while len(self._lazy) > self._lazy_batches:
+                self._lazy.popitem(last=False)
+        return column
+
+    def column(self, name):
+        """A whole column as a chunked array over the mapped file (no copy)."""
+        if name not in self.schema.names:
+            return None
+        return pa.chunked_array(
+            [self._reader.get_batch(i).column(name) for i in range(self.num_batches)],
+            type=self.schema.field(name).type
+        )
+
+    def value(self, row_id, name):
+        """Read one cell of any column, loading its row group on demand."""
+        if name not in self.schema.names:
+            return None
+        batch, offset = self._locate(int(row_id))
+        return self._lazy_column(name, batch)[offset].as_py()
+
+    def explanation(self, row_id):
+        return self.value(row_id, 'explanation')
+
+
+def question_at(table, index):
+    """Return row ``index`` of a ``QuestionStore.take`` result as scalars.
+
+    ``options`` stays an Arrow list scalar; call ``render_options`` when the
+    widget actually needs Python strings.
+    """
+    return {name: table.column(name)[index] for name in table.column_names}
+
+
+def render_options(options):
+    return [str(o) for o in options.values.to_pylist()]
+
+
+def answer_index(options, answer):
+    """0-based index of the correct option; ``answer`` is the dataset's 1-based index.
+
+    Raises ``TypeError``/``ValueError`` for a non-numeric answer and
+    ``IndexError`` for one outside the options (0 would otherwise pick the last).
+    """
+    index = int(answer) - 1
+    if not 0 <= index < len(options):
+        raise IndexError(f"answer {answer!r} is not one of {len(options)} options")
+    return index
+
+
+def correct_option(options, answer):
+    """Text of the correct option; ``answer`` is the dataset's 1-based index."""
+    return options[answer_index(options, answer)]
+
+
+# ----- Pre-generated Explanations -----
+class ExplanationSidecar:
+    """Explanations produced offline by ``pregenerate_explanations.py``.
+
+    The Parquet sidecar holds ``row_id``, ``language`` and ``explanation``;
+    it is kept as an Arrow table sorted by row id and searched with NumPy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            table = pq.read_table(path).sort_by([('row_id', 'ascending'), ('language', 'ascending')])
+        else:
+            table = None
+        self._table = table
+        self._row_ids = np.asarray(table.column('row_id')) if table is not None else np.zeros(0, np.int64)
+
+    def __len__(self):
+        return len(self._row_ids)
+
+    def get(self, row_id, language):
+        """Explanation for a row in "Tamil" or "English", or None."""
+        if self._table is None:
+            return None
+        start = np.searchsorted(self._row_ids, row_id, side='left')
+        end = np.searchsorted(self._row_ids, row_id, side='right')
+        languages = self._table.column('language')
+        for i in range(start, end):
+            if languages[i].as_py() == language:
+                return self._table.column('explanation')[i].as_py()
+        return None
+
+
+def load_question_store(**snapshot_kwargs):
+    """Ensure a local snapshot exists and open it as a ``QuestionStore``."""
+    return QuestionStore(ensure_snapshot(**snapshot_kwargs))
@@ -0,0 +1,268 @@
+"""Streaming, sharded generation of multiple-choice quizzes.
+
+A request for ``count`` questions is split into small shards that stream in
+parallel through the shared ``LLMClient``. Each shard's output is parsed
+incrementally: every JSON object is decoded as soon as its closing brace
+arrives, validated on its own and deduplicated against the other shards, so
+one malformed item costs only that item and the first question is available
+while the rest are still being written. Missing items are topped up with
+further (smaller) rounds instead of regenerating the whole quiz.
+
+Replies are constrained to ``QUIZ_QUESTIONS_SCHEMA``, sized to the shard,
+where the transport supports it; the tolerant parser covers models and
+endpoints that do not.
+"""
+import json
+import queue
+import re
+import threading
+
+from language import normalize_query
+from prompts import quiz_questions_prompt, quiz_questions_schema
+from rate_limit import STUDY
+
+SHARD_SIZE = 4
+MAX_ROUNDS = 3
+REQUIRED_KEYS = ('question', 'options', 'answer', 'explanation')
+
+
+# ----- Incremental Parsing -----
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class JSONObjectStream:
+    """Feeds text chunks in, yields each complete top-level JSON object out.
+
+    Only bracket nesting (outside string literals) is tracked, so the
+    enclosing array, code fences or chatter around the objects are ignored.
+    Strings may hold raw control characters; objects that still fail to
+    decode are retried without trailing commas, and ``finish`` closes an
+    object cut off by a truncated reply. Repaired objects count as ``salvaged``, the rest that
+    still fail as ``malformed``.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.buffer = []
+        self.size = 0         # characters buffered for the open object
+        self.last_field = 0   # offset of its last top-level comma
+        self.salvaged = 0
+        self.malformed = 0
+
+    def feed(self, text):
+        objects = []
+        start = 0 if self.stack else None
+        offset = self.size
+        for i, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                if self.stack:
+                    self.in_string = True
+            elif char == '{' or (char == '[' and self.stack):
+                if not self.stack:
+                    start = i
+                    offset = -i
+                    self.last_field = 0
+                self.stack.append(char)
+            elif char == ',' and len(self.stack) == 1:
+                self.last_field = offset + i
+            elif self.stack and char == _CLOSERS[self.stack[-1]]:
+                self.stack.pop()
+                if not self.stack:
+                    self.buffer.append(text[start:i + 1])
+                    start = None
+                    item = self._decode("".join(self.buffer))
+                    self.buffer = []
+                    self.size = 0
+                    if item is not None:
+                        objects.append(item)
+        if self.stack and start is not None:
+            self.buffer.append(text[start:])
+            self.size += len(text) - start
+        return objects
+
+    def finish(self):
+        """Salvage the object a truncated reply left open, if any.
+
+        Open strings and brackets are closed; when that does not decode, the
+        object is cut back to its last complete field.
+        """
+        if not self.stack:
+            return []
+        raw = "".join(self.buffer)
+        closed = raw[:-1] if self.escaped else raw
+        if self.in_string:
+            closed += '"'
+        closed = closed.rstrip().rstrip(',').rstrip()
+        closed += "".join(_CLOSERS[opener] for opener in reversed(self.stack))
+        candidates = [closed]
+        if self.last_field:
+            candidates.append(raw[:self.last_field] + "}")
+        self.stack, self.buffer, self.size = [], [], 0
+        self.in_string = self.escaped = False
+        for candidate in candidates:
+            item = self._decode(candidate, repaired=True, count_failure=False)
+            if item is not None:
+                return [item]
+        self.malformed += 1
+        return []
+
+    def _decode(self, raw, repaired=False, count_failure=True):
+        for attempt in (raw, _TRAILING_COMMA.sub(r"\1", raw)):
+            try:
+                item = json.loads(attempt, strict=False)
+            except ValueError:
+                repaired = True
+                continue
+            if repaired:
+                self.salvaged += 1
+            return item
+        if count_failure:
+            self.malformed += 1
+        return None
+
+
+# ----- Validation -----
+def validate_question(item):
+    """The item as a clean question dict, or None if it breaks the quiz rules.
+
+    A question needs all four keys, exactly 4 options and an answer that is
+    one of the options.
+    """
+    if not isinstance(item, dict) or any(key not in item for key in REQUIRED_KEYS):
+        return None
+    options = item['options']
+    if not isinstance(options, list) or len(options) != 4 or item['answer'] not in options:
+        return None
+    return {key: item[key] for key in REQUIRED_KEYS}
+
+
+def question_key(question):
+    """Dedup key: the question text with case, spacing and punctuation removed."""
+    return normalize_query(str(question['question']))
+
+
+def shard_sizes(count, shard_size=SHARD_SIZE):
+    """Split ``count`` into near-equal shards of at most ``shard_size``."""
+    if count <= 0:
+        return []
+    shards = -(-count // shard_size)
+    base, extra = divmod(count, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+# ----- Generation -----
+class QuizGenerator:
+    """Generates validated, distinct questions for a topic through ``client``."""
+
+    def __init__(self, client, shard_size=SHARD_SIZE, max_rounds=MAX_ROUNDS, timeout=90):
+        self.client = client
+        self.shard_size = shard_size
+        self.max_rounds = max_rounds
+        self.timeout = timeout
+        self.counters = {
+            'quizzes': 0, 'shards': 0, 'top_ups': 0, 'questions': 0,
+            'salvaged': 0, 'malformed': 0, 'invalid': 0, 'duplicates': 0,
+            'shard_errors': 0, 'short_quizzes': 0, 'failures': 0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def _run_shard(self, prompt, size, results, stop):
+        stream = self.client.stream(prompt, timeout=self.timeout, priority=STUDY,
+                                    json_schema=quiz_questions_schema(size))
+        parser = JSONObjectStream()
+        try:
+            for chunk in stream:
+                for item in parser.feed(chunk):
+                    results.put(('item', item))
+                if stop.is_set():
+                    break
+            else:
+                for item in parser.finish():
+                    results.put(('item', item))
+            results.put(('done', None))
+        except Exception as e:
+            # Objects completed before the failure are still usable
+            for item in parser.finish():
+                results.put(('item', item))
+            results.put(('error', e))
+        finally:
+            stream.close()
+            self._count('salvaged', parser.salvaged)
+            self._count('malformed', parser.malformed)
+
+    def stream(self, topic, count, language):
+        """Yield up to ``count`` valid, distinct questions as they arrive.
+
+        Raises the last shard error if no question at all could be generated.
+        """
+        seen = set()
+        produced = []
+        last_error = None
+        stop = threading.Event()
+        self._count('quizzes')
+        try:
+            for round_number in range(self.max_rounds):
+                missing = count - len(produced)
+                if missing <= 0:
+                    return
+                if round_number:
+                    self._count('top_ups')
+                results = queue.Queue()
+                # Top-up rounds are told what already exists
+                exclude = [q['question'] for q in produced] or None
+                shards = shard_sizes(missing, self.shard_size)
+                self._count('shards', len(shards))
+                for index, size in enumerate(shards, 1):
+                    prompt = quiz_questions_prompt(topic, size, language,
+                                                   batch=(index, len(shards)), exclude=exclude)
+                    threading.Thread(target=self._run_shard,
+                                     args=(prompt, size, results, stop), daemon=True).start()
+
+                running = len(shards)
+                while running:
+                    kind, value = results.get()
+                    if kind == 'done':
+                        running -= 1
+                    elif kind == 'error':
+                        running -= 1
+                        last_error = value
+                        self._count('shard_errors')
+                    else:
+                        question = validate_question(value)
+                        if question is None:
+                            self._count('invalid')
+                            continue
+                        key = question_key(question)
+                        if not key or key in seen:
+                            self._count('duplicates')
+                            continue
+                        seen.add(key)
+                        produced.append(question)
+                        self._count('questions')
+                        yield question
+                        if len(produced) >= count:
+                            return
+            self._count('short_quizzes' if produced else 'failures')
+            if not produced and last_error is not None:
+                raise last_error
+        finally:
+            # Tells shards still writing to drop their streams
+            stop.set()
@@ -0,0 +1,173 @@
+"""Indexed quiz sampling over the shared question store.
+
+Row ids are grouped once into sorted index arrays per facet value (language,
+plus subject and difficulty when the dataset has them). Drawing a quiz picks
+random positions in the matching pool and skips rows already in the
+session's seen-bitmap, so a draw costs O(k) rather than O(dataset).
+"""
+import threading
+
+import numpy as np
+
+LANGUAGES = ('tamil', 'english')
+# Optional dataset columns that become filter dimensions when present
+FACET_COLUMNS = ('subject', 'difficulty')
+
+
+class SeenBitmap:
+    """One bit per question: which rows a session has already been served."""
+
+    def __init__(self, size):
+        self.size = size
+        self.bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+        # Rows of the most recent draw, kept out of the first draw of a new cycle
+        self.last = np.zeros(0, dtype=np.int64)
+
+    def contains(self, row_ids):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        return (self.bits[row_ids >> 3] >> (row_ids & 7).astype(np.uint8)) & 1 == 1
+
+    def add(self, row_ids):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        np.bitwise_or.at(self.bits, row_ids >> 3, (1 << (row_ids & 7)).astype(np.uint8))
+
+    def discard(self, row_ids):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        np.bitwise_and.at(self.bits, row_ids >> 3, ~(1 << (row_ids & 7)).astype(np.uint8))
+
+
+class QuizSampler:
+    """Draws quizzes from precomputed per-facet row-id indexes.
+
+    With ``clusters`` (``dedup.QuestionClusters``) only each near-duplicate
+    cluster's canonical row is indexed, so a cluster is drawn and marked
+    seen as one question.
+    """
+
+    def __init__(self, store, max_cached_pools=64, clusters=None):
+        self.size = len(store)
+        self.all_rows = np.arange(self.size, dtype=np.int64)
+        self.indexes = {
+            'language': {
+                'tamil': store.language_row_ids(True).astype(np.int64),
+                'english': store.language_row_ids(False).astype(np.int64),
+            }
+        }
+        for name in FACET_COLUMNS:
+            column = store.column(name)
+            if column is not None:
+                self.indexes[name] = self._group_rows(column)
+        if clusters is not None:
+            self._keep_rows(clusters.canonical_rows)
+
+        self._pools = {}
+        self._max_cached_pools = max_cached_pools
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _group_rows(column):
+        """Map each distinct value of a column to the sorted row ids holding it."""
+        encoded = column.combine_chunks().dictionary_encode()
+        codes = np.asarray(encoded.indices.fill_null(-1), dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(encoded.dictionary))
+        bounds = np.cumsum(np.concatenate([[np.count_nonzero(codes < 0)], counts]))
+        groups = {}
+        for code, value in enumerate(encoded.dictionary.to_pylist()):
+            rows = order[bounds[code]:bounds[code + 1]]
+            if len(rows):
+                groups[str(value)] = rows
+        return groups
+
+    def _keep_rows(self, row_ids):
+        keep = np.zeros(self.size, dtype=bool)
+        keep[row_ids] = True
+        self.all_rows = self.all_rows[keep[self.all_rows]]
+        for groups in self.indexes.values():
+            for value, rows in list(groups.items()):
+                rows = rows[keep[rows]]
+                if len(rows):
+                    groups[value] = rows
+                else:
+                    del groups[value]
+
+    def facet_values(self, name):
+        """Available values of a filter dimension, e.g. all subjects."""
+        return sorted(self.indexes.get(name, {}))
+
+    def pool(self, **filters):
+        """Sorted row ids matching every given ``facet=value`` filter."""
+        active = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+        if not active:
+            return self.all_rows
+        with self._lock:
+            cached = self._pools.get(active)
+        if cached is not None:
+            return cached
+
+        rows = None
+        for name, value in active:
+            facet_rows = self.indexes.get(name, {}).get(value)
+            if facet_rows is None:
+                rows = np.zeros(0, dtype=np.int64)
+                break
+            rows = facet_rows if rows is None else np.intersect1d(rows, facet_rows, assume_unique=True)
+
+        with self._lock:
+            if len(self._pools) >= self._max_cached_pools:
+                self._pools.pop(next(iter(self._pools)))
+            self._pools[active] = rows
+        return rows
+
+    def new_seen_bitmap(self):
+        return SeenBitmap(self.size)
+
+    def sample(self, k, seen=None, rng=None, **filters):
+        """Draw up to ``k`` distinct row ids from the filtered pool.
+
+        Rows set in ``seen`` are skipped and the drawn rows are added to it, so
+        consecutive quizzes never repeat a question until the pool has been
+        exhausted; at that point the pool's bits are cleared and a new cycle
+        begins, still excluding the previous draw's rows while the pool allows.
+        """
+        rng = rng or np.random.default_rng()
+        pool = self.pool(**filters)
+        k = min(k, len(pool))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        picked = []
+        picked_set = set()
+        # Rejection sampling: a bounded number of O(1) draws
+        for position in rng.integers(0, len(pool), size=4 * k + 16):
+            row_id = int(pool[position])
+            if row_id in picked_set or (seen is not None and seen.contains(row_id)):
+                continue
+            picked.append(row_id)
+            picked_set.add(row_id)
+            if len(picked) == k:
+                break
+
+        if len(picked) < k:
+            # Pool is mostly seen: fall back to scanning the unseen remainder
+            unseen = pool if seen is None else pool[~seen.contains(pool)]
+            unseen = unseen[~np.isin(unseen, picked)]
+            if len(unseen) < k - len(picked):
+                # Everything has been served once; start a new cycle, keeping the
+                # previous quiz's rows marked so consecutive quizzes do not overlap
+                seen.discard(pool)
+                seen.add(seen.last)
+                seen.add(picked)
+                unseen = pool[~seen.contains(pool)]
+                if len(unseen) < k - len(picked):
+                    # Pool smaller than two quizzes: some overlap is unavoidable
+                    seen.discard(seen.last)
+                    seen.add(picked)
+                    unseen = pool[~seen.contains(pool)]
+            picked.extend(rng.choice(unseen, size=k - len(picked), replace=False).tolist())
+
+        row_ids = np.asarray(picked, dtype=np.int64)
+        if seen is not None:
+            seen.add(row_ids)
+            seen.last = row_ids
+        return row_ids
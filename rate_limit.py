@@ -0,0 +1,324 @@
+"""Process-wide rate limiting and priority scheduling for model calls.
+
+Every session shares one API key, so every model call in the process goes
+through one ``Scheduler``. A call takes a ticket before it starts: tickets
+are granted strictly by priority (``INTERACTIVE`` chat and explanations,
+then ``STUDY`` material and generated quizzes, then ``BACKGROUND`` prefetch
+and batch work), first come first served within a priority, and only when
+a worker slot is free and the ``RateLimiter``'s requests-per-minute and
+tokens-per-minute buckets can cover the call.
+
+Waiting callers can see their queue position and an estimated wait, and new
+callers can ask how many requests are ahead of them, so the UI can show
+backpressure instead of a silent spinner. Each priority's queue is bounded
+on its own, so a flood of study or background work can never make an
+interactive call fail; past the bound, ``QueueFull`` is raised at once.
+
+Time comes from a clock object, so ``FakeClock`` makes the whole scheduler
+deterministic in tests and simulations.
+"""
+import threading
+import time
+
+import telemetry
+
+INTERACTIVE = 0
+STUDY = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', STUDY: 'study', BACKGROUND: 'background'}
+
+
+class QueueFull(Exception):
+    """Too many calls are already waiting; try again later."""
+
+
+class AdmissionTimeout(Exception):
+    """The call's deadline passed while it was still waiting for its turn."""
+
+
+def estimate_tokens(text):
+    """Rough token count: about four UTF-8 bytes per token (Tamil letters are three)."""
+    return len(str(text).encode('utf-8')) // 4 + 1
+
+
+# ----- Clocks -----
+class MonotonicClock:
+    """Real time."""
+
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, condition, timeout):
+        """Wait on ``condition`` (held by the caller) for at most ``timeout`` seconds."""
+        condition.wait(timeout)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class FakeClock:
+    """Time that only moves when ``advance`` is called.
+
+    Waiters registered through ``wait`` or ``sleep`` are woken on every
+    advance and re-check their own deadlines.
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._conditions = set()
+        self._ticked = threading.Condition()
+
+    def now(self):
+        return self._now
+
+    def advance(self, seconds):
+        with self._ticked:
+            self._now += seconds
+            conditions = list(self._conditions)
+            self._ticked.notify_all()
+        for condition in conditions:
+            with condition:
+                condition.notify_all()
+
+    def wait(self, condition, timeout):
+        # Real waits are unbounded; only advance() or a notify ends them
+        self._conditions.add(condition)
+        condition.wait()
+
+    def sleep(self, seconds):
+        with self._ticked:
+            until = self._now + seconds
+            while self._now < until:
+                self._ticked.wait()
+
+
+# ----- Token Buckets -----
+class TokenBucket:
+    """Refills ``per_minute`` units a minute up to ``burst`` (default: one minute's worth)."""
+
+    def __init__(self, per_minute, burst=None, clock=None):
+        self.capacity = float(burst or per_minute)
+        self.rate = per_minute / 60.0
+        self.clock = clock or MonotonicClock()
+        self.level = self.capacity
+        self.updated = self.clock.now()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill(now)
+        # A call larger than the whole bucket goes through once the bucket is full
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount, now):
+        """Remove ``amount`` units; the level may go negative (debt repaid by refill)."""
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount, now):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits checked together.
+
+    ``rpm`` or ``tpm`` of None/0 means that dimension is unlimited.
+    """
+
+    def __init__(self, rpm=None, tpm=None, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.requests = TokenBucket(rpm, clock=self.clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock=self.clock) if tpm else None
+
+    def wait_time(self, tokens, requests=1):
+        now = self.clock.now()
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(requests, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def take(self, tokens, requests=1):
+        now = self.clock.now()
+        if self.requests is not None:
+            self.requests.take(requests, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+
+    def settle(self, reserved, used):
+        """Correct a call's token reservation once its real size is known."""
+        if self.tokens is None or used == reserved:
+            return
+        now = self.clock.now()
+        if used > reserved:
+            self.tokens.take(used - reserved, now)
+        else:
+            self.tokens.give(reserved - used, now)
+
+
+# ----- Scheduler -----
+class Ticket:
+    """One admitted (or waiting) call."""
+
+    __slots__ = ('priority', 'seq', 'tokens', 'key', 'enqueued_at', 'granted_at', 'released')
+
+    def __init__(self, priority, seq, tokens, key, now):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.key = key
+        self.enqueued_at = now
+        self.granted_at = None
+        self.released = False
+
+    def order(self):
+        return (self.priority, self.seq)
+
+
+class Scheduler:
+    """Priority queue in front of a ``RateLimiter`` and ``max_concurrent`` worker slots.
+
+    ``max_queue`` bounds the waiting calls of each priority separately.
+    """
+
+    def __init__(self, limiter=None, max_concurrent=8, max_queue=200, clock=None):
+        self.clock = clock or (limiter.clock if limiter is not None else MonotonicClock())
+        self.limiter = limiter or RateLimiter(clock=self.clock)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.running = 0
+        self._waiting = []
+        self._seq = 0
+        self._changed = threading.Condition()
+        self.counters = {'granted': 0, 'rejected': 0, 'timeouts': 0, 'promoted': 0}
+
+    # ----- Admission -----
+    def _head(self):
+        return min(self._waiting, key=Ticket.order)
+
+    def _waiting_at(self, priority):
+        return sum(1 for ticket in self._waiting if ticket.priority == priority)
+
+    def _ahead_of(self, ticket):
+        return sum(1 for other in self._waiting if other.order() < ticket.order())
+
+    def _estimate_wait(self, ahead, tokens):
+        # The queue ahead plus this call, as far as the rate limits are concerned
+        return self.limiter.wait_time(tokens * (ahead + 1), requests=ahead + 1)
+
+    def acquire(self, priority=INTERACTIVE, tokens=1, timeout=None, key=None, on_wait=None):
+        """Block until the call may start and return its ``Ticket``.
+
+        ``on_wait(position, eta_seconds)`` is called, without the scheduler's
+        lock held, whenever the caller's queue position changes while it waits
+        (position 0 = next in line).
+        Raises ``QueueFull`` when ``max_queue`` calls of the same priority are
+        already waiting and ``AdmissionTimeout`` when ``timeout`` passes first.
+        """
+        with self._changed:
+            start = self.clock.now()
+            waiting = self._waiting_at(priority)
+            if waiting >= self.max_queue:
+                self.counters['rejected'] += 1
+                raise QueueFull(f"{waiting} {PRIORITY_NAMES.get(priority, priority)} AI requests "
+                                "are already waiting")
+            ticket = Ticket(priority, self._seq, tokens, key, start)
+            self._seq += 1
+            self._waiting.append(ticket)
+            last_position = None
+            try:
+                while True:
+                    now = self.clock.now()
+                    wait = None
+                    if self._head() is ticket and self.running < self.max_concurrent:
+                        wait = self.limiter.wait_time(ticket.tokens)
+                        if wait <= 0:
+                            break
+                    if timeout is not None and now - start >= timeout:
+                        self.counters['timeouts'] += 1
+                        raise AdmissionTimeout(f"Still queued after {timeout:g}s")
+                    if on_wait is not None:
+                        position = self._ahead_of(ticket)
+                        if position != last_position:
+                            last_position = position
+                            eta = self._estimate_wait(position, ticket.tokens)
+                            # The callback may be slow (it updates the UI), so every
+                            # other caller must not wait on it: run it unlocked
+                            self._changed.release()
+                            try:
+                                on_wait(position, eta)
+                            finally:
+                                self._changed.acquire()
+                            continue  # The queue may have moved meanwhile
+                    if timeout is not None:
+                        remaining = timeout - (now - start)
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self.clock.wait(self._changed, wait)
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._changed.notify_all()
+                raise
+
+            self._waiting.remove(ticket)
+            self.limiter.take(ticket.tokens)
+            self.running += 1
+            ticket.granted_at = self.clock.now()
+            self.counters['granted'] += 1
+            self._changed.notify_all()
+        telemetry.observe("llm_queue_seconds", ticket.granted_at - start,
+                          priority=PRIORITY_NAMES.get(priority, str(priority)))
+        return ticket
+
+    def charge(self, ticket):
+        """Count a retry of an admitted call against the rate limits, without waiting."""
+        with self._changed:
+            self.limiter.take(ticket.tokens)
+
+    def release(self, ticket, used_tokens=None):
+        """Free the ticket's worker slot and settle its real token usage."""
+        with self._changed:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.running -= 1
+            if used_tokens is not None:
+                self.limiter.settle(ticket.tokens, used_tokens)
+            self._changed.notify_all()
+
+    def promote(self, key, priority):
+        """Raise waiting calls with ``key`` to ``priority`` (a more urgent caller joined them)."""
+        with self._changed:
+            promoted = False
+            for ticket in self._waiting:
+                if ticket.key == key and priority < ticket.priority:
+                    ticket.priority = priority
+                    promoted = True
+            if promoted:
+                self.counters['promoted'] += 1
+                self._changed.notify_all()
+
+    # ----- Backpressure -----
+    def queue_position(self, priority=INTERACTIVE):
+        """How many waiting calls a new call of ``priority`` would queue behind."""
+        with self._changed:
+            return sum(1 for ticket in self._waiting if ticket.priority <= priority)
+
+    def estimated_wait(self, priority=INTERACTIVE, tokens=1):
+        """Rough seconds before a new call of ``priority`` would start."""
+        with self._changed:
+            ahead = sum(1 for ticket in self._waiting if ticket.priority <= priority)
+            return self._estimate_wait(ahead, tokens)
+
+    def stats(self):
+        with self._changed:
+            stats = dict(self.counters, running=self.running, waiting=len(self._waiting))
+            for priority, name in PRIORITY_NAMES.items():
+                stats[f"waiting_{name}"] = self._waiting_at(priority)
+        return stats
@@ -0,0 +1,125 @@
+"""BM25 retrieval over the question bank for grounding the AI tutor.
+
+Documents are the question, options and explanation of each bank row,
+tokenized with ``language.tokenize``. Postings are stored term-major in flat
+NumPy arrays (CSR layout) with precomputed BM25 weights, so scoring a query
+is one vectorized add per query term.
+"""
+from collections import Counter
+
+import numpy as np
+
+from language import tokenize
+from question_store import correct_option
+
+# Token-set overlap above which a query is treated as asking the bank question itself
+EXACT_MATCH_JACCARD = 0.9
+SNIPPET_CHARS = 300
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        vocabulary = {}
+        term_ids, doc_ids, freqs = [], [], []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for token, count in counts.items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+                freqs.append(count)
+
+        self.vocabulary = vocabulary
+        self.num_docs = len(documents)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf = np.asarray(freqs, dtype=np.float32)[order]
+        doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+        self.term_ptr = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+
+        avg_length = lengths.mean() if self.num_docs else 1.0
+        idf = np.log1p((self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths[self.doc_ids] / max(avg_length, 1e-6))
+        self.weights = np.repeat(idf, doc_freq) * tf * (k1 + 1) / (tf + norm)
+
+    def search(self, query, k=5):
+        """Top ``k`` ``(doc_id, score)`` pairs for ``query``, best first."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.term_ptr[term], self.term_ptr[term + 1]
+            # Doc ids within one posting list are unique, so plain fancy-add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(int(i), float(scores[i])) for i in matched]
+
+
+class QuestionRetriever:
+    """BM25 index over a ``QuestionStore`` plus helpers for the tutor chat."""
+
+    def __init__(self, store):
+        self.store = store
+        questions = store.column('question').to_pylist()
+        options = store.column('options').to_pylist()
+        explanation_column = store.column('explanation')
+        explanations = explanation_column.to_pylist() if explanation_column is not None else [None] * len(questions)
+        documents = [
+            " ".join([q or ''] + [str(o) for o in (opts or [])] + [e or ''])
+            for q, opts, e in zip(questions, options, explanations)
+        ]
+        self.index = BM25Index(documents)
+
+    def item(self, row_id):
+        """Question, correct answer and explanation of one bank row."""
+        question = self.store.value(row_id, 'question')
+        options = self.store.value(row_id, 'options') or []
+        try:
+            answer = correct_option(options, self.store.value(row_id, 'answer'))
+        except (TypeError, ValueError, IndexError):
+            answer = None
+        return {
+            'row_id': row_id,
+            'question': question,
+            'answer': answer,
+            'explanation': self.store.explanation(row_id),
+        }
+
+    def search(self, query, k=3):
+        return [dict(self.item(row_id), score=score) for row_id, score in self.index.search(query, k)]
+
+    def exact_match(self, query, hits):
+        """The hit whose question is (almost) exactly the query, if any."""
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return None
+        for hit in hits:
+            question_tokens = set(tokenize(hit['question']))
+            overlap = len(query_tokens & question_tokens) / len(query_tokens | question_tokens)
+            if overlap >= EXACT_MATCH_JACCARD and hit['answer'] is not None:
+                return hit
+        return None
+
+    @staticmethod
+    def context(hits):
+        """Compact prompt context: one short snippet per retrieved item."""
+        snippets = []
+        for i, hit in enumerate(hits, 1):
+            explanation = (hit['explanation'] or '').strip().replace("\n", " ")
+            if len(explanation) > SNIPPET_CHARS:
+                explanation = explanation[:SNIPPET_CHARS] + "..."
+            snippet = f"{i}. Q: {hit['question']}\n   A: {hit['answer']}"
+            if explanation:
+                snippet += f"\n   Explanation: {explanation}"
+            snippets.append(snippet)
+        return "\n".join(snippets)
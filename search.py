@@ -0,0 +1,170 @@
+"""Character n-gram search over the question bank.
+
+Whitespace tokens work poorly for Tamil (agglutinative words, inconsistent
+spacing and spelling), so questions are indexed by overlapping character
+trigrams of their ``language.normalize_query`` form (computed in NumPy for
+the whole bank at once), Tamil combining marks included.
+The index is built in one vectorized pass: every trigram is packed into a
+uint64 (three 21-bit code points), and postings are stored gram-major in
+flat NumPy arrays (CSR layout, int32 row ids), as in ``retrieval.BM25Index``.
+
+A query adds the IDF of each of its grams to the rows in that gram's posting
+list. Rows must cover ``min_share`` of the query's total IDF to match, which
+tolerates typos and spelling variants, and are ranked by their covered IDF
+with a mild row-length normalization.
+"""
+import unicodedata
+
+import numpy as np
+
+NGRAM = 3
+# Longest queries (a pasted question) only use their rarest grams
+MAX_QUERY_GRAMS = 40
+_SEPARATOR = 0
+
+
+# Code points that language.normalize_query turns into a space: punctuation, symbols, whitespace
+_TO_SPACE = np.array([unicodedata.category(chr(cp))[0] in 'PS' or chr(cp).isspace()
+                      for cp in range(0x10000)], dtype=bool)
+_SPACE = ord(' ')
+
+
+def _codepoints(texts):
+    """``normalize_query`` of every text, space-padded and joined by separators.
+
+    Vectorized over the whole bank: NFC and case folding run once on the
+    joined string, then punctuation is mapped to spaces and runs of spaces are
+    collapsed in NumPy.
+    """
+    text = "\0".join(f" {str(t or '').replace(chr(_SEPARATOR), ' ')} " for t in texts)
+    if not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    codepoints = np.frombuffer(text.casefold().encode('utf-32-le'), dtype=np.uint32).copy()
+    bmp = codepoints < 0x10000
+    codepoints[bmp & _TO_SPACE[np.minimum(codepoints, 0xFFFF)]] = _SPACE
+    repeated = np.zeros(len(codepoints), dtype=bool)
+    repeated[1:] = (codepoints[1:] == _SPACE) & (codepoints[:-1] == _SPACE)
+    return codepoints[~repeated]
+
+
+def _gram_codes(codepoints):
+    """Packed trigram codes and their start positions, skipping separators."""
+    if len(codepoints) < NGRAM:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    c = codepoints.astype(np.uint64)
+    codes = (c[:-2] << np.uint64(42)) | (c[1:-1] << np.uint64(21)) | c[2:]
+    valid = (codepoints[:-2] != _SEPARATOR) & (codepoints[1:-1] != _SEPARATOR) & (codepoints[2:] != _SEPARATOR)
+    positions = np.flatnonzero(valid)
+    return codes[positions], positions
+
+
+def _sorted_unique(values):
+    # np.sort plus a neighbour compare; much faster than np.unique on large int arrays
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def trigram_occurrences(documents):
+    """``(grams, gram_of, doc_of)``: sorted distinct trigram codes, then the
+    gram index and document of every trigram occurrence, in document order."""
+    codepoints = _codepoints(documents)
+    codes, positions = _gram_codes(codepoints)
+    grams = _sorted_unique(codes)
+    # Document of each position = number of separators before it
+    doc_of = np.cumsum(codepoints == _SEPARATOR)[positions]
+    return grams, np.searchsorted(grams, codes).astype(np.int64), doc_of
+
+
+def trigram_postings(documents):
+    """``(grams, gram_of, doc_ids)``: sorted distinct trigram codes and the
+    distinct ``(gram index, document)`` pairs, gram-major."""
+    documents = list(documents)
+    grams, gram_of, doc_of = trigram_occurrences(documents)
+    stride = max(len(documents), 1)
+    pairs = _sorted_unique(gram_of * stride + doc_of)
+    return grams, pairs // stride, (pairs % stride).astype(np.int32)
+
+
+def question_documents(store):
+    """Question and option text of every row of a ``QuestionStore``, for indexing."""
+    questions = store.column('question').to_pylist()
+    options = store.column('options').to_pylist()
+    return [" ".join([q or ''] + [str(o) for o in (opts or [])])
+            for q, opts in zip(questions, options)]
+
+
+class NgramIndex:
+    """Inverted index from character trigrams to row ids."""
+
+    def __init__(self, documents, length_weight=0.5):
+        documents = list(documents)
+        self.num_docs = len(documents)
+        self.grams, gram_of, self.doc_ids = trigram_postings(documents)
+        doc_freq = np.bincount(gram_of, minlength=len(self.grams))
+        self.gram_ptr = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+        self.idf = np.log1p((self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        lengths = np.bincount(self.doc_ids, minlength=self.num_docs).astype(np.float32)
+        average = lengths.mean() if self.num_docs else 1.0
+        self.norm = (1 - length_weight) + length_weight * lengths / max(average, 1e-6)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.grams, self.doc_ids, self.gram_ptr, self.idf, self.norm))
+
+    def _query_grams(self, query):
+        """The query's distinct gram codes and the index ids of those in the bank."""
+        codes = _sorted_unique(_gram_codes(_codepoints([query]))[0])
+        if not len(self.grams):
+            return codes, np.zeros(0, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(self.grams, codes), len(self.grams) - 1)
+        return codes, slots[self.grams[slots] == codes]
+
+    def search(self, query, page=0, per_page=10, min_share=0.6):
+        """``(total, [(row_id, score), ...])`` for one page of ranked matches."""
+        codes, found = self._query_grams(query)
+        if not len(codes) or not len(found):
+            return 0, []
+        if len(found) > MAX_QUERY_GRAMS:
+            found = found[np.argsort(-self.idf[found], kind='stable')[:MAX_QUERY_GRAMS]]
+            needed = min_share * float(self.idf[found].sum())
+        else:
+            # Grams missing from the bank count against the query at the highest IDF
+            missing = len(codes) - len(found)
+            needed = min_share * (float(self.idf[found].sum()) + missing * float(self.idf.max(initial=0.0)))
+
+        # One weighted bincount over the concatenated posting lists
+        starts, ends = self.gram_ptr[found], self.gram_ptr[found + 1]
+        postings = np.concatenate([self.doc_ids[s:e] for s, e in zip(starts, ends)])
+        covered = np.bincount(postings, weights=np.repeat(self.idf[found], ends - starts),
+                              minlength=self.num_docs)
+
+        matched = np.flatnonzero(covered >= needed - 1e-6)
+        total = len(matched)
+        if not total:
+            return 0, []
+        scores = covered[matched] / self.norm[matched]
+        top = min(total, (page + 1) * per_page)
+        if top < total:
+            best = np.argpartition(-scores, top - 1)[:top]
+            matched, scores = matched[best], scores[best]
+        order = np.lexsort((matched, -scores))[page * per_page:(page + 1) * per_page]
+        return total, [(int(matched[i]), float(scores[i])) for i in order]
+
+
+class QuestionSearch:
+    """``NgramIndex`` over a ``QuestionStore``'s question and option text."""
+
+    def __init__(self, store):
+        self.store = store
+        self.index = NgramIndex(question_documents(store))
+
+    def search(self, query, page=0, per_page=10):
+        """``(total, rows, scores)``: ``rows`` is the ranked ``take`` table of one page."""
+        total, hits = self.index.search(query, page, per_page)
+        if not hits:
+            return total, None, []
+        row_ids = [row_id for row_id, _ in hits]
+        return total, self.store.take(row_ids), [score for _, score in hits]
@@ -0,0 +1,111 @@
+"""Compact per-session records kept in ``st.session_state``.
+
+Every open browser tab holds its quiz progress and chat history for as long
+as the session lives, so thousands of sessions multiply whatever each one
+keeps. These records hold row ids into the shared ``QuestionStore`` and one
+byte per question for the chosen option instead of sampled tables, DataFrames
+and per-answer dicts repeating the question text. Text a session has to own
+(generated questions, chat turns) is interned, so identical strings -- the
+same cached answer served to many sessions, repeated option labels -- are
+stored once per process.
+"""
+import sys
+from array import array
+from collections import deque
+
+UNANSWERED = -1
+CHAT_HISTORY_TURNS = 10
+
+
+def intern_text(value):
+    """``value`` interned when it is a str, unchanged otherwise."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class AnswerSheet:
+    """Chosen option index per question (one signed byte each) and the score."""
+
+    __slots__ = ('choices', 'current_index', 'score', 'show_results')
+
+    def __init__(self, size):
+        self.choices = array('b', [UNANSWERED]) * size
+        self.current_index = 0
+        self.score = 0
+        self.show_results = False
+
+    def __len__(self):
+        return len(self.choices)
+
+    def answer(self, choice, correct_choice):
+        """Record ``choice`` for the current question and move on."""
+        self.choices[self.current_index] = choice
+        if choice == correct_choice:
+            self.score += 1
+        if self.current_index < len(self.choices) - 1:
+            self.current_index += 1
+        else:
+            self.show_results = True
+
+    def answered(self):
+        """(index, choice) for every answered question, in order."""
+        return [(i, c) for i, c in enumerate(self.choices) if c != UNANSWERED]
+
+
+class QuizAttempt(AnswerSheet):
+    """A practice quiz over question-bank rows, referenced by row id only."""
+
+    __slots__ = ('row_ids', 'ai_explanations')
+
+    def __init__(self, row_ids):
+        self.row_ids = array('i', (int(r) for r in row_ids))
+        super().__init__(len(self.row_ids))
+        self.ai_explanations = None   # {index: text}, created on first request
+
+    def ai_explanation(self, index):
+        return self.ai_explanations.get(index) if self.ai_explanations else None
+
+    def set_ai_explanation(self, index, text):
+        if self.ai_explanations is None:
+            self.ai_explanations = {}
+        self.ai_explanations[index] = text
+
+
+class GeneratedQuestion:
+    """One model-generated question; the answer is kept as an option index."""
+
+    __slots__ = ('question', 'options', 'answer_index', 'explanation')
+
+    def __init__(self, question, options, answer_index, explanation):
+        self.question = intern_text(question)
+        self.options = tuple(intern_text(o) for o in options)
+        self.answer_index = answer_index
+        self.explanation = intern_text(explanation)
+
+    @classmethod
+    def from_dict(cls, item):
+        """Build from a ``quiz_generator.validate_question`` result."""
+        options = item['options']
+        return cls(item['question'], options, options.index(item['answer']),
+                   item.get('explanation') or 'No explanation available')
+
+    @property
+    def answer(self):
+        return self.options[self.answer_index]
+
+
+class ChatHistory:
+    """The last ``CHAT_HISTORY_TURNS`` (question, answer) pairs, interned."""
+
+    __slots__ = ('turns',)
+
+    def __init__(self, max_turns=CHAT_HISTORY_TURNS):
+        self.turns = deque(maxlen=max_turns)
+
+    def __iter__(self):
+        return iter(self.turns)
+
+    def __len__(self):
+        return len(self.turns)
+
+    def append(self, question, answer):
+        self.turns.append((intern_text(question), intern_text(answer)))
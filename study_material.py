@@ -0,0 +1,123 @@
+"""Study material assembled from per-topic parts.
+
+The free-text topics box is split into individual topics, and each one is
+generated and cached on its own under ``(topic, language)``. The order and
+spelling of the list therefore do not matter, and a common syllabus topic is
+generated once for all users. Missing topics are generated on a small
+shared pool and the document is assembled in input order as the parts
+arrive. Only the first ``MAX_TOPICS`` topics of one request are used.
+"""
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from language import normalize_query
+from llm_cache import cache_key
+from prompts import study_material_prompt
+from rate_limit import STUDY
+
+# Separators between topics: commas (ASCII and full-width), semicolons,
+# pipes, new lines and list bullets
+_TOPIC_SEPARATOR = re.compile(r"[,;|\n،，•]+")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*]|\d+[.)])\s+")
+
+# Topics used from one request; a pasted syllabus would otherwise flood the AI queue
+MAX_TOPICS = 8
+
+
+def split_topics(text):
+    """Distinct topics in input order; duplicates differing only in case,
+    spacing or punctuation are dropped."""
+    topics = []
+    seen = set()
+    for line in _TOPIC_SEPARATOR.split(text or ""):
+        topic = " ".join(_LIST_MARKER.sub("", line).split())
+        key = normalize_query(topic)
+        if key and key not in seen:
+            seen.add(key)
+            topics.append(topic)
+    return topics
+
+
+def topic_cache_key(topic, language):
+    return cache_key(normalize_query(topic), language)
+
+
+class StudyMaterialBuilder:
+    """Streams a study document, reusing cached topic parts.
+
+    ``cache`` is any object with ``get(key)`` / ``put(key, value)``; the app
+    passes a ``TwoTierCache``.
+    """
+
+    def __init__(self, client, cache, timeout=90, max_workers=4, max_topics=MAX_TOPICS):
+        self.client = client
+        self.cache = cache
+        self.timeout = timeout
+        self.max_topics = max_topics
+        # Shared by every session: bounds the STUDY calls this builder has in flight
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="study")
+
+    def _generate(self, topic, language, chunks, stop):
+        if stop.is_set():
+            return
+        stream = self.client.stream(study_material_prompt(topic, language), timeout=self.timeout,
+                                    priority=STUDY)
+        parts = []
+        try:
+            for text in stream:
+                if stop.is_set():
+                    return
+                parts.append(text)
+                chunks.put(('chunk', text))
+            self.cache.put(topic_cache_key(topic, language), "".join(parts))
+            chunks.put(('done', None))
+        except Exception as e:
+            chunks.put(('error', e))
+        finally:
+            stream.close()
+
+    def stream(self, text, language, on_error=None):
+        """Yield the document for every topic in ``text`` chunk by chunk.
+
+        Cached topics come out at once; the rest are generated concurrently
+        and yielded in input order. ``on_error(topic, exc)`` returns the text
+        shown in place of a topic that failed (which is not cached). Topics
+        past ``max_topics`` are ignored.
+        """
+        topics = split_topics(text)[:self.max_topics]
+        stop = threading.Event()
+        cached = {}
+        pending = {}
+        futures = []
+        try:
+            for topic in topics:
+                cached[topic] = self.cache.get(topic_cache_key(topic, language))
+                if cached[topic] is None:
+                    pending[topic] = queue.Queue()
+                    futures.append(self._pool.submit(self._generate, topic, language,
+                                                     pending[topic], stop))
+
+            for i, topic in enumerate(topics):
+                if len(topics) > 1:
+                    yield ("\n\n" if i else "") + f"## {topic}\n\n"
+                if topic not in pending:
+                    yield cached[topic]
+                    continue
+                while True:
+                    kind, value = pending[topic].get()
+                    if kind == 'chunk':
+                        yield value
+                    elif kind == 'done':
+                        break
+                    else:
+                        if on_error is None:
+                            raise value
+                        yield on_error(topic, value)
+                        break
+        finally:
+            # Stops generations the reader no longer waits for
+            stop.set()
+            for future in futures:
+                future.cancel()
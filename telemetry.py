@@ -0,0 +1,292 @@
+"""Opt-in timings and counters for reruns, page sections and LLM calls.
+
+Enabled with TNPSC_TELEMETRY=1. Durations and sizes go into fixed-bucket
+histograms (p50/p95/p99 are interpolated from the buckets, as Prometheus
+does); caches and clients register collectors whose ``stats()`` are read at
+export time. Everything is exported as Prometheus text or JSON, in the app's
+admin view and, with TNPSC_TELEMETRY_PORT set, over HTTP at ``/metrics`` and
+``/metrics.json``.
+
+When disabled, ``span`` hands back a shared no-op, ``timed`` returns the
+function unchanged and ``observe``/``count`` return after one flag check.
+"""
+import bisect
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+ENABLED = os.getenv("TNPSC_TELEMETRY", "0").lower() in ("1", "true", "yes")
+PREFIX = "tnpsc_"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate of the ``q`` quantile, interpolated inside its bucket."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.bounds):
+                    return self.bounds[-1]   # beyond the last bound
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def summary(self):
+        result = {'count': self.count, 'sum': self.sum,
+                  'mean': self.sum / self.count if self.count else None}
+        for q in QUANTILES:
+            result[f"p{round(q * 100)}"] = self.quantile(q)
+        return result
+
+
+class Registry:
+    """Histograms and counters keyed by name and labels, plus collectors."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.collectors = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, buckets, labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def count(self, name, n, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def register(self, name, collect):
+        with self._lock:
+            self.collectors[name] = collect
+
+    def collected(self):
+        """Numeric values reported by every collector, as ``{name: {key: value}}``."""
+        with self._lock:
+            collectors = dict(self.collectors)
+        values = {}
+        for name, collect in collectors.items():
+            try:
+                stats = collect()
+            except Exception:
+                continue
+            values[name] = {k: v for k, v in stats.items()
+                            if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        return values
+
+    def to_dict(self):
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        return {
+            'histograms': [{'name': name, 'labels': dict(labels), **h.summary()}
+                           for (name, labels), h in sorted(histograms, key=lambda kv: kv[0])],
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters)],
+            'collectors': self.collected(),
+        }
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items(), key=lambda kv: kv[0])
+            counters = sorted(self.counters.items())
+
+        typed = set()
+        for (name, labels), histogram in histograms:
+            metric = _metric_name(name)
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(list(histogram.bounds) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            metric = _metric_name(name) + "_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        for name, stats in sorted(self.collected().items()):
+            for key, value in sorted(stats.items()):
+                metric = _metric_name(f"{name}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name):
+    return PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+registry = Registry()
+
+
+# ----- Recording API -----
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        registry.histogram(f"{self.name}_seconds", LATENCY_BUCKETS, self.labels).observe(elapsed)
+        # Streamlit's rerun/stop signals are BaseExceptions, not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            registry.count(f"{self.name}_errors", 1, self.labels)
+        return False
+
+
+def span(name, **labels):
+    """Context manager timing a block into the ``<name>_seconds`` histogram."""
+    if not ENABLED:
+        return _NOOP_SPAN
+    return _Span(name, labels)
+
+
+def timed(name, **labels):
+    """Decorator form of ``span``; a no-op (the function itself) when disabled.
+
+    A generator function is timed from its first item until it is exhausted
+    or closed, i.e. for as long as its output is being streamed.
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(name, labels):
+                    yield from func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(name, labels):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    if ENABLED:
+        registry.histogram(name, buckets, labels).observe(value)
+
+
+def count(name, n=1, **labels):
+    if ENABLED:
+        registry.count(name, n, labels)
+
+
+def register_collector(name, collect):
+    """Export ``collect()``'s numeric values (e.g. a cache's ``stats``) as gauges."""
+    if ENABLED:
+        registry.register(name, collect)
+
+
+# ----- HTTP Export -----
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve ``/metrics`` (Prometheus) and ``/metrics.json`` once per process."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.prometheus_text().encode('utf-8')
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.to_dict()).encode('utf-8')
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="telemetry-http",
+                             daemon=True).start()
+    return _server